@@ -2,29 +2,69 @@ import os
 from dotenv import load_dotenv
 
 from db.db_helper import load_faiss_vector_store
-from llm.langchain_utils import create_conversational_chain
+from db.manifest import index_version
+from llm.answer_cache import SemanticAnswerCache
+from llm.conversation_memory import create_summary_chain
+from llm.langchain_utils import create_conversational_chain, get_chat_model
+from llm.tracing import get_request_tracer, start_metrics_server
 from app_utils.streamlit_utils import initialize_session_state, display_chat_interface
+from app_utils.warmup import WarmUp
 import streamlit as st
 #st.write("Loaded secrets:", list(st.secrets.keys()))
 
 load_dotenv(override=True)
 
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
-os.environ["LANGCHAIN_PROJECT"]=" Mental HealthCare Chatbot"
+# LangSmith tracing is opt-in (LANGCHAIN_TRACING_V2=true); per-stage timings are recorded locally
+os.environ.setdefault("LANGCHAIN_PROJECT", " Mental HealthCare Chatbot")
+
+DB_PATH = "faiss_db_raptor"
+
+def _warm_retriever(results):
+    retriever = load_faiss_vector_store(DB_PATH)
+    # A first query embeds text and searches the index, so neither is paid by the first user
+    retriever.invoke("How can I cope with stress?")
+    return retriever
+
+@st.cache_resource
+def _start_warmup():
+    # Started once per process; pages render while the steps load in the background
+    return WarmUp([
+        ("retriever", _warm_retriever),
+        ("chain", lambda results: create_conversational_chain(results["retriever"])),
+        # Shares the query embedding model with the retriever
+        ("answer_cache", lambda results: SemanticAnswerCache.from_env(
+            results["retriever"].vectorstore.embeddings, index_version(DB_PATH)
+        )),
+        ("summary_chain", lambda results: create_summary_chain(get_chat_model())),
+    # Without a summary chain, old turns are dropped instead of folded into a summary
+    ], optional=["summary_chain"]).start()
+
+def get_warmup():
+    warmup = _start_warmup()
+    if warmup.error is not None:
+        # Retry a failed warm-up on this rerun instead of keeping it cached until a restart
+        _start_warmup.clear()
+        warmup = _start_warmup()
+    return warmup
 
 @st.cache_resource
-def get_chain():
-    retriever = load_faiss_vector_store()
-    return create_conversational_chain(retriever)
+def get_metrics_server():
+    # Prometheus endpoint on METRICS_PORT, once per process
+    port = os.getenv("METRICS_PORT")
+    tracer = get_request_tracer()
+    if not port or tracer is None:
+        return None
+    return start_metrics_server(int(port), tracer)
 
 def main():
     """
     Main function to run the Streamlit application.
     """
-    conversation_chain = get_chain()
+    warmup = get_warmup()
+    get_metrics_server()
 
     initialize_session_state()
-    display_chat_interface(conversation_chain)
+    display_chat_interface(warmup)
 
 
 if __name__ == "__main__":
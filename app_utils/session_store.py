@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.runnables import Runnable
+
+from llm.conversation_memory import ConversationMemory
+
+
+class Session:
+    """
+    Server-side state of one conversation.
+
+    `lock` serializes the turns of a session, so a follow-up is never answered before the
+    previous turn has been added to its memory.
+    """
+
+    def __init__(self, session_id: str, memory: ConversationMemory):
+        self.session_id = session_id
+        self.memory = memory
+        self.lock = asyncio.Lock()
+        self.last_seen = time.monotonic()
+
+
+class SessionStore:
+    """
+    In-process conversations keyed by session ID, evicted after `ttl` seconds of inactivity
+    or, least recently used first, beyond `max_sessions`.
+
+    Args:
+        summary_chain (Runnable): Chain from `create_summary_chain` for every session's memory.
+        ttl (float): Seconds of inactivity after which a session is dropped.
+        max_sessions (int): Maximum number of sessions kept.
+    """
+
+    def __init__(
+        self,
+        summary_chain: Optional[Runnable] = None,
+        ttl: float = 3600,
+        max_sessions: int = 10000,
+    ):
+        self.summary_chain = summary_chain
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls, summary_chain: Optional[Runnable] = None) -> "SessionStore":
+        """Build a store from SESSION_TTL and MAX_SESSIONS."""
+        return cls(
+            summary_chain,
+            ttl=float(os.getenv("SESSION_TTL", "3600")),
+            max_sessions=int(os.getenv("MAX_SESSIONS", "10000")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            if oldest.lock.locked():
+                # Never drop a conversation mid-turn
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """
+        Return the session for `session_id`, creating it (with a new ID if none is given).
+        """
+        now = time.monotonic()
+        self._evict(now)
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = session_id or uuid.uuid4().hex
+            session = Session(session_id, ConversationMemory.from_env(self.summary_chain))
+            self._sessions[session_id] = session
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        # Again after the insert, so a new session never takes the store past `max_sessions`
+        self._evict(now)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
@@ -1,24 +1,27 @@
 import streamlit as st
 import time
 from langchain.chains import create_retrieval_chain
-from langchain_core.messages import HumanMessage
 from app_utils.styles import get_custom_css
+from app_utils.warmup import WarmUp
+from llm.answer_cache import SemanticAnswerCache, answer_cache_policy
+from llm.conversation_memory import ConversationMemory
+from llm.streaming import StreamStats, stream_answer
 
-def initialize_session_state():
+def initialize_session_state(summary_chain=None):
     """
     Initialize session state variables for chat history and messages.
+
+    The chat history is a token-budgeted `ConversationMemory`; `summary_chain` folds
+    turns that fall out of its window into a running summary.
     """
     if "chat_history" not in st.session_state:
-        st.session_state["chat_history"] = []
+        st.session_state["chat_history"] = ConversationMemory.from_env(summary_chain)
 
     if "messages" not in st.session_state:
         st.session_state["messages"] = []
     
     if "chat_started" not in st.session_state:
         st.session_state["chat_started"] = False
-    
-    if "show_loading" not in st.session_state:
-        st.session_state["show_loading"] = True
 
 def get_chat_history_text():
     """Convert chat history to a formatted string for download."""
@@ -29,51 +32,33 @@ def get_chat_history_text():
         history_text += "-" * 50 + "\n\n"
     return history_text
 
-def stream_text(text):
-    """Generator function to simulate streaming text."""
-    for word in text.split(" "):
-        yield word + " "
-        time.sleep(0.02)
+def handle_user_query(
+    get_conversation_chain: create_retrieval_chain,
+    user_query: str,
+    answer_cache: SemanticAnswerCache = None,
+):
+    """
+    Handle the user query and stream the response from the conversation chain.
 
-def show_initial_loading():
-    """Display an initial loading animation when the app starts."""
-    if st.session_state.get("show_loading", True):
-        loading_container = st.empty()
-        
-        with loading_container.container():
-            st.markdown("""
-                <div style="text-align: center; padding: 100px 20px;">
-                    <h1 style="font-size: 3rem; background: linear-gradient(135deg, #ffffff 0%, #a8edea 100%); 
-                               -webkit-background-clip: text; -webkit-text-fill-color: transparent; 
-                               font-family: 'Poppins', sans-serif; animation: fadeInDown 1s ease-out;">
-                        🧠 Mental Healthcare Chatbot
-                    </h1>
-                    <p style="font-size: 1.2rem; color: rgba(255,255,255,0.8); margin-top: 20px; animation: fadeIn 1.5s ease-out;">
-                        Initializing your safe space...
-                    </p>
-                    <div style="margin-top: 40px;">
-                        <div style="width: 60px; height: 60px; margin: 0 auto; border: 5px solid rgba(255,255,255,0.3); 
-                                    border-top: 5px solid #ffffff; border-radius: 50%; animation: spin 1s linear infinite;">
-                        </div>
-                    </div>
-                </div>
-                <style>
-                    @keyframes spin {
-                        0% { transform: rotate(0deg); }
-                        100% { transform: rotate(360deg); }
-                    }
-                </style>
-            """, unsafe_allow_html=True)
-        
-        time.sleep(2)  # Show loading for 2 seconds
-        loading_container.empty()
-        st.session_state["show_loading"] = False
-        st.rerun()
+    Answer tokens are written with `st.write_stream` as the LLM produces them, so this
+    must be called inside the assistant chat message container. The time to first token
+    of the last answer is kept in `st.session_state["last_ttft"]`.
 
-def handle_user_query(get_conversation_chain: create_retrieval_chain, user_query: str):
-    """
-    Handle the user query and get the response from the conversation chain.
+    First-turn and self-contained questions are answered from `answer_cache` when a
+    cached answer to the same or a near-identical question exists. Only first-turn
+    answers are stored; see `answer_cache_policy`.
     """
+    memory = st.session_state["chat_history"]
+    may_look_up, may_store = answer_cache_policy(len(memory), user_query)
+    if answer_cache is not None and may_look_up:
+        started_at = time.perf_counter()
+        cached_answer = answer_cache.lookup(user_query)
+        if cached_answer is not None:
+            st.markdown(cached_answer)
+            st.session_state["last_ttft"] = time.perf_counter() - started_at
+            memory.add_turn(user_query, cached_answer)
+            return cached_answer
+
     # Create a placeholder for the thinking animation
     thinking_placeholder = st.empty()
     
@@ -85,20 +70,29 @@ def handle_user_query(get_conversation_chain: create_retrieval_chain, user_query
                 </p>
             </div>
         """, unsafe_allow_html=True)
-    
-    # Get the response
-    response = get_conversation_chain.invoke(
-        {"input": user_query, "chat_history": st.session_state["chat_history"]}
-    )
-    
-    # Clear the thinking animation
+
+    stats = StreamStats()
+
+    def answer_tokens():
+        for i, token in enumerate(stream_answer(
+            get_conversation_chain,
+            {"input": user_query, "chat_history": memory.messages()},
+            stats,
+        )):
+            if i == 0:
+                # Clear the thinking animation as soon as the answer starts
+                thinking_placeholder.empty()
+            yield token
+
+    st.write_stream(answer_tokens())
     thinking_placeholder.empty()
+    st.session_state["last_ttft"] = stats.time_to_first_token
 
-    st.session_state["chat_history"].extend(
-        [HumanMessage(content=user_query), response["answer"]]
-    )
+    memory.add_turn(user_query, stats.answer)
+    if answer_cache is not None and may_store and stats.answer:
+        answer_cache.store(user_query, stats.answer)
 
-    return response["answer"]
+    return stats.answer
 
 def display_landing_page():
     """Display the welcoming landing page with animations."""
@@ -184,18 +178,25 @@ def display_landing_page():
         </div>
     """, unsafe_allow_html=True)
 
-def display_chat_interface(conversation_chain: create_retrieval_chain):
+def display_warmup_status(warmup: WarmUp):
+    """Show in the sidebar whether the model, index and LLM client have finished loading."""
+    if warmup.ready:
+        st.caption("✅ Ready")
+    elif warmup.error is not None:
+        st.caption("⚠️ The assistant could not start. Retrying on your next message.")
+    else:
+        st.caption(f"⏳ Getting ready ({warmup.current_step.replace('_', ' ')})...")
+
+def display_chat_interface(warmup: WarmUp):
     """
     Display the chat interface using Streamlit.
+
+    The page renders straight away; the conversation chain, answer cache and summary chain
+    are taken from `warmup`, waiting for them only when a question has to be answered.
     """
     # Apply Custom CSS
     st.markdown(get_custom_css(), unsafe_allow_html=True)
 
-    # Show initial loading animation
-    if st.session_state.get("show_loading", True):
-        show_initial_loading()
-        return
-
     # Sidebar for Mood Check & Tools
     with st.sidebar:
         st.markdown("""
@@ -230,9 +231,8 @@ def display_chat_interface(conversation_chain: create_retrieval_chain):
         
         if st.button("🔄 Clear Chat History", use_container_width=True):
             st.session_state.messages = []
-            st.session_state.chat_history = []
+            st.session_state.chat_history.clear()
             st.session_state.chat_started = False
-            st.session_state.show_loading = False
             st.rerun()
             
         st.download_button(
@@ -244,6 +244,8 @@ def display_chat_interface(conversation_chain: create_retrieval_chain):
         )
 
         st.markdown("---")
+
+        display_warmup_status(warmup)
         
         # Quick tips section
         st.markdown("""
@@ -270,18 +272,40 @@ def display_chat_interface(conversation_chain: create_retrieval_chain):
             with st.chat_message(message["role"], avatar="🧑" if message["role"] == "user" else "🤖"):
                 st.markdown(message["content"])
 
+        # A starter topic from the landing page is waiting for its answer
+        pending_query = None
+        if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
+            pending_query = st.session_state.messages[-1]["content"]
+
         # React to user input
         if user_query := st.chat_input("Share your thoughts... 💭"):
             # Display user message in chat message container
             st.chat_message("user", avatar="🧑").markdown(user_query)
             # Add user message to chat history
             st.session_state.messages.append({"role": "user", "content": user_query})
+            pending_query = user_query
 
-            response_text = handle_user_query(conversation_chain, user_query)
-
-            # Display assistant response with streaming effect
+        if pending_query:
+            # Stream the assistant response as it is generated
             with st.chat_message("assistant", avatar="🤖"):
-                st.write_stream(stream_text(response_text))
+                try:
+                    if not warmup.is_ready("answer_cache"):
+                        with st.spinner("Getting ready..."):
+                            warmup.get("answer_cache")
+                    conversation_chain = warmup.get("chain")
+                    answer_cache = warmup.get("answer_cache")
+                except RuntimeError:
+                    # The failure is logged by the warm-up; the question stays pending for the next rerun
+                    st.markdown(
+                        "😔 Sorry, I couldn't get ready to answer just now. "
+                        "Please try sending your message again in a moment."
+                    )
+                    return
+                # Old turns are only folded into a summary once the summary chain is loaded
+                memory = st.session_state["chat_history"]
+                if memory.summary_chain is None and warmup.is_ready("summary_chain"):
+                    memory.summary_chain = warmup.get("summary_chain")
+                response_text = handle_user_query(conversation_chain, pending_query, answer_cache)
             
             # Add assistant response to chat history
             st.session_state.messages.append({"role": "assistant", "content": response_text})
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+Step = Tuple[str, Callable[[Dict[str, Any]], Any]]
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Loads resources in named steps on a background thread and reports readiness.
+
+    Steps run in order; each receives the results of the previous steps. `get` blocks only
+    until the requested step has finished, so a page can render while later steps are still
+    loading. If a step fails, it is logged, the remaining steps are skipped and `get` raises
+    a RuntimeError; the owner should then start a new `WarmUp` to retry. A failed `optional`
+    step is only logged: later steps still run and the warm-up counts as ready without it.
+
+    Args:
+        steps (List[Step]): (name, function) pairs.
+        optional (Sequence[str]): Steps the app can do without.
+    """
+
+    def __init__(self, steps: List[Step], optional: Sequence[str] = ()):
+        self.steps = steps
+        self.optional = set(optional)
+        self.status: Dict[str, str] = {name: "pending" for name, _ in steps}
+        self.durations: Dict[str, float] = {}
+        self.error: Optional[BaseException] = None
+        self._results: Dict[str, Any] = {}
+        self._finished = {name: threading.Event() for name, _ in steps}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WarmUp":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        for name, step in self.steps:
+            if self.error is not None:
+                self.status[name] = "skipped"
+                self._finished[name].set()
+                continue
+            self.status[name] = "running"
+            started = time.perf_counter()
+            try:
+                self._results[name] = step(self._results)
+                self.status[name] = "ready"
+            except Exception as e:
+                logger.exception("Warm-up step %r failed", name)
+                if name not in self.optional:
+                    self.error = e
+                self.status[name] = "failed"
+            self.durations[name] = time.perf_counter() - started
+            self._finished[name].set()
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            status == "ready" or (name in self.optional and status == "failed")
+            for name, status in self.status.items()
+        )
+
+    def is_ready(self, name: str) -> bool:
+        return self.status[name] == "ready"
+
+    @property
+    def current_step(self) -> Optional[str]:
+        return next((name for name, status in self.status.items() if status in ("running", "pending")), None)
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Result of step `name`, waiting for it to finish.
+        """
+        self.start()
+        if not self._finished[name].wait(timeout):
+            raise TimeoutError(f"Warm-up step {name!r} still {self.status[name]}")
+        if self.status[name] != "ready":
+            raise RuntimeError(f"Warm-up step {name!r} {self.status[name]}") from self.error
+        return self._results[name]
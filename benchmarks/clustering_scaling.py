@@ -0,0 +1,104 @@
+"""
+Scaling benchmark for RAPTOR clustering.
+
+Runs `cluster_assignments` on synthetic bge-small sized embeddings and, where it fits in
+memory, replays the old embedding-equality matching over the same clusters for comparison.
+
+    python -m benchmarks.clustering_scaling --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from llm.clustering import cluster_assignments
+
+
+def synthetic_embeddings(
+    n_rows: int, n_dims: int = 384, n_topics: int = 40, duplicate_fraction: float = 0.01, seed: int = 0
+) -> np.ndarray:
+    """
+    Generate unit-norm embeddings drawn around `n_topics` random centres, with a fraction of exact duplicate rows.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_topics, n_dims))
+    embeddings = centres[rng.integers(n_topics, size=n_rows)] + 0.3 * rng.normal(size=(n_rows, n_dims))
+    n_duplicates = int(n_rows * duplicate_fraction)
+    if n_duplicates:
+        embeddings[rng.choice(n_rows, n_duplicates, replace=False)] = embeddings[
+            rng.choice(n_rows, n_duplicates, replace=False)
+        ]
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings.astype(np.float32)
+
+
+def legacy_matching(embeddings: np.ndarray, assignments, mem_limit_bytes: int):
+    """
+    Replay the old per-cluster `np.where((embeddings == members[:, None]).all(-1))` lookup.
+
+    Returns (seconds, number of wrongly attributed rows), or None when the largest
+    boolean tensor would exceed `mem_limit_bytes`.
+    """
+    sizes = np.bincount(assignments.clusters, minlength=assignments.n_clusters)
+    peak_bytes = int(sizes.max(initial=0)) * embeddings.shape[0] * embeddings.shape[1]
+    if peak_bytes > mem_limit_bytes:
+        return None, peak_bytes
+
+    start = time.perf_counter()
+    wrong = 0
+    for c in range(assignments.n_clusters):
+        rows = assignments.rows[assignments.clusters == c]
+        if len(rows) == 0:
+            continue
+        matched = np.where((embeddings == embeddings[rows][:, None]).all(-1))[1]
+        wrong += len(matched) - len(rows)
+    return (time.perf_counter() - start, wrong), peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=10, help="UMAP target dimensionality")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--legacy-mem-limit-gb", type=float, default=2.0)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.sizes:
+        embeddings = synthetic_embeddings(n_rows)
+
+        start = time.perf_counter()
+        assignments = cluster_assignments(embeddings, args.dim, args.threshold)
+        elapsed = time.perf_counter() - start
+
+        legacy, legacy_peak = legacy_matching(
+            embeddings, assignments, int(args.legacy_mem_limit_gb * 1024**3)
+        )
+        row = {
+            "rows": n_rows,
+            "clusters": assignments.n_clusters,
+            "cluster_assignments_s": round(elapsed, 3),
+            "legacy_match_peak_bytes": legacy_peak,
+            "legacy_match_s": round(legacy[0], 3) if legacy else None,
+            "legacy_wrong_rows": legacy[1] if legacy else None,
+        }
+        results.append(row)
+        legacy_text = (
+            f"{row['legacy_match_s']:.3f}s, {row['legacy_wrong_rows']} wrong rows"
+            if legacy
+            else f"skipped, needs {legacy_peak / 1024**3:.1f} GiB"
+        )
+        print(
+            f"{n_rows:>7} rows  {assignments.n_clusters:>4} clusters  "
+            f"clustering {elapsed:8.2f}s  legacy matching: {legacy_text}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
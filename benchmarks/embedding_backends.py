@@ -0,0 +1,87 @@
+"""
+Speed and cosine drift of the ONNX Runtime embedding backends against the torch backend.
+
+Embeds the same texts with every available backend, one query at a time and in document
+batches, and compares each backend's vectors with the reference backend's ('torch' when it is
+installed, else fp32 'onnx'). Drift is 1 - cosine similarity per text; top-k agreement is the
+overlap of nearest-neighbour lists of each query within the corpus.
+
+    python -m benchmarks.embedding_backends --texts 512 --queries 64
+"""
+import argparse
+import importlib.util
+import time
+
+import numpy as np
+
+from llm.embedding_backends import EMBEDDING_BACKENDS, create_embeddings
+from llm.langchain_utils import DEFAULT_EMBEDDING_MODEL
+
+SENTENCES = [
+    "Cognitive behavioural therapy helps people notice and change unhelpful thought patterns.",
+    "Regular sleep, exercise and social contact protect against low mood.",
+    "Panic attacks often peak within ten minutes and are not dangerous.",
+    "Grief can come in waves long after a loss.",
+    "Talking to a trusted person is a good first step when you feel overwhelmed.",
+    "Mindfulness practice trains attention on the present moment without judgement.",
+    "Burnout is linked to chronic workplace stress that has not been managed.",
+    "Antidepressants can take several weeks before their full effect is felt.",
+]
+
+
+def make_texts(n_texts: int):
+    return [f"{SENTENCES[i % len(SENTENCES)]} Note {i}: {SENTENCES[(i * 3 + 1) % len(SENTENCES)]}" for i in range(n_texts)]
+
+
+def run(embeddings, texts, queries):
+    embeddings.embed_documents(texts[:8])  # warm-up
+    start = time.perf_counter()
+    documents = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    query_vectors = np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+    query_seconds = time.perf_counter() - start
+    return documents, query_vectors, batch_seconds, query_seconds
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    queries = [f"Question {i}: {SENTENCES[i % len(SENTENCES)].lower()}" for i in range(args.queries)]
+    backends = [
+        b for b in EMBEDDING_BACKENDS if b != "torch" or importlib.util.find_spec("torch") is not None
+    ]
+
+    results = {b: run(create_embeddings(args.model, b), texts, queries) for b in backends}
+    reference = backends[0]
+    ref_docs, ref_queries, ref_batch, ref_query = results[reference]
+    ref_top = np.argsort(-(_unit(ref_queries) @ _unit(ref_docs).T), axis=1)[:, : args.k]
+
+    print(f"reference backend: {reference}")
+    print(
+        f"{'backend':<10} {'docs/s':>8} {'query ms':>9} {'speedup':>8} "
+        f"{'mean drift':>11} {'max drift':>10} {'top-k agree':>12}"
+    )
+    for backend in backends:
+        docs, query_vectors, batch_seconds, query_seconds = results[backend]
+        drift = 1 - np.sum(_unit(docs) * _unit(ref_docs), axis=1)
+        top = np.argsort(-(_unit(query_vectors) @ _unit(docs).T), axis=1)[:, : args.k]
+        agreement = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, ref_top)])
+        print(
+            f"{backend:<10} {len(texts) / batch_seconds:>8.1f} {query_seconds / len(queries) * 1000:>9.2f} "
+            f"{ref_batch / batch_seconds:>7.2f}x {drift.mean():>11.2e} {drift.max():>10.2e} {agreement:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
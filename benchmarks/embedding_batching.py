@@ -0,0 +1,78 @@
+"""
+Load test for cross-session query-embedding batching.
+
+Simulates concurrent chat sessions as threads that each embed a stream of distinct questions,
+once against the plain embedding model and once through `BatchedEmbeddings`, and reports
+throughput and latency percentiles per number of concurrent users.
+
+    python -m benchmarks.embedding_batching --users 1 8 32 --requests 50 --max-wait-ms 5
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from db.db_helper import _embedding_model
+from llm.embedding_batcher import BatchedEmbeddings
+
+QUESTIONS = [
+    "How can I cope with anxiety before an exam?",
+    "What are the early signs of depression?",
+    "How do I support a friend who is grieving?",
+    "Is it normal to feel tired all the time when stressed?",
+    "What breathing exercises help with panic attacks?",
+    "How much sleep do I need to feel rested?",
+    "When should I talk to a therapist?",
+    "How can I stop overthinking at night?",
+]
+
+
+def load(embeddings, users: int, requests: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def session(user: int):
+        local = []
+        for i in range(requests):
+            question = f"{QUESTIONS[(user + i) % len(QUESTIONS)]} ({user}-{i})"
+            start = time.perf_counter()
+            embeddings.embed_query(question)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=session, args=(u,)) for u in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=50, help="Queries per user")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = _embedding_model()
+    model.embed_query("warm-up")
+
+    print(f"{'users':>5} {'mode':<9} {'qps':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    for users in args.users:
+        batched = BatchedEmbeddings(model, args.max_batch_size, args.max_wait_ms)
+        for mode, embeddings in (("unbatched", model), ("batched", batched)):
+            qps, latencies = load(embeddings, users, args.requests)
+            batch = f"{batched.mean_batch_size:6.1f}" if embeddings is batched else f"{'1.0':>6}"
+            print(
+                f"{users:>5} {mode:<9} {qps:>8.1f} {np.percentile(latencies, 50):>8.2f} "
+                f"{np.percentile(latencies, 99):>8.2f} {batch}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Recall-vs-latency benchmark for FAISS index types.
+
+Builds each index-factory string over the same vectors and reports recall@k against the
+exact flat index, p50/p99 single-query latency and serialized index size. Vectors come from
+the on-disk embedding store when it has enough rows, else from a synthetic generator.
+
+    python -m benchmarks.faiss_index_types --factories Flat HNSW32 "IVF256,PQ32" SQ8 --k 4
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from db.faiss_index import apply_search_params, build_index, default_search_params
+from llm.langchain_utils import DEFAULT_EMBEDDING_MODEL
+
+
+def load_vectors(n_rows: int, n_dims: int = 384, seed: int = 0) -> np.ndarray:
+    store_dir = os.path.join(
+        os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings"), DEFAULT_EMBEDDING_MODEL.replace("/", "__")
+    )
+    vectors_path = os.path.join(store_dir, "vectors.f32")
+    if os.path.exists(vectors_path):
+        vectors = np.fromfile(vectors_path, dtype=np.float32).reshape(-1, n_dims)
+        if len(vectors) >= n_rows:
+            return vectors[:n_rows]
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(64, n_dims))
+    vectors = centres[rng.integers(64, size=n_rows)] + 0.5 * rng.normal(size=(n_rows, n_dims))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--factories", nargs="+", default=["Flat", "HNSW32", "IVF256,PQ32", "IVF256,SQ8", "SQ8"])
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.rows)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    exact = build_index(vectors, "Flat")
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{len(vectors)} vectors, {args.queries} queries, k={args.k}")
+    print(f"{'index':<16} {'params':<14} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'MiB':>8} {'build s':>8}")
+    for factory in args.factories:
+        start = time.perf_counter()
+        index = build_index(vectors, factory)
+        build_s = time.perf_counter() - start
+        params = default_search_params(factory)
+        apply_search_params(index, params)
+
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found.append(ids[0])
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        size_mib = faiss.serialize_index(index).nbytes / 1024**2
+
+        print(
+            f"{factory:<16} {params or '-':<14} {recall:>9.3f} {np.percentile(latencies, 50):>8.3f} "
+            f"{np.percentile(latencies, 99):>8.3f} {size_mib:>8.1f} {build_s:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
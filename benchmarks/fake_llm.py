@@ -0,0 +1,127 @@
+"""
+Deterministic offline chat model for benchmarks.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeChatModel to mimic an HTTP 429 from the provider."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for an injected latency and echoes a truncated prompt.
+
+    With `tokens_per_second` set, the reply is produced word by word at that rate after
+    `latency`, so `latency` acts as the time to first token and streaming yields one word
+    per chunk.
+
+    Attributes:
+        latency (float): Seconds per call, or to the first token when streaming.
+        jitter (float): Uniform +/- jitter added to the latency.
+        tail_rate (float): Probability that a call takes `tail_latency` instead, e.g. when throttled.
+        tail_latency (float): Latency of the slow tail.
+        error_rate (float): Probability that a call fails with FakeRateLimitError.
+        reply_words (int): Number of prompt words echoed back as the answer.
+        seed (int): Seed for the latency and error draws.
+        tokens_per_second (float): Generation rate of the reply; 0 returns it all at once.
+    """
+
+    latency: float = 0.2
+    jitter: float = 0.0
+    tail_rate: float = 0.0
+    tail_latency: float = 0.0
+    error_rate: float = 0.0
+    reply_words: int = 64
+    seed: int = 0
+    tokens_per_second: float = 0.0
+    calls: int = 0
+    errors: int = 0
+
+    _rng: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark-chat"
+
+    def _draw(self):
+        """Return (delay, should_fail) for the next call."""
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            if self._rng.random() < self.tail_rate:
+                delay = self.tail_latency
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return delay, fail
+
+    def _reply_words(self, messages: List[BaseMessage]) -> List[str]:
+        words = " ".join(str(m.content) for m in messages).split()
+        return words[-self.reply_words:]
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        text = " ".join(self._reply_words(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generation_time(self, messages: List[BaseMessage]) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(self._reply_words(messages)) / self.tokens_per_second
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeRateLimitError("429 Too Many Requests")
+        time.sleep(self._generation_time(messages))
+        return self._reply(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeRateLimitError("429 Too Many Requests")
+        await asyncio.sleep(self._generation_time(messages))
+        return self._reply(messages)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeRateLimitError("429 Too Many Requests")
+        for i, word in enumerate(self._reply_words(messages)):
+            if i and self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        delay, fail = self._draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeRateLimitError("429 Too Many Requests")
+        for i, word in enumerate(self._reply_words(messages)):
+            if i and self.tokens_per_second:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
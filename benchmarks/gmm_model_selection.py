@@ -0,0 +1,51 @@
+"""
+Benchmark the fast GMM model selection against the exhaustive BIC sweep.
+
+Runs `get_optimal_clusters` in both modes on UMAP-sized (10-dimensional) synthetic blobs
+with a known number of components and reports the chosen k and wall-clock time.
+
+    python -m benchmarks.gmm_model_selection --rows 500 2000 8000 --true-k 5 20
+"""
+import argparse
+import time
+
+import numpy as np
+
+from llm.clustering import get_optimal_clusters
+
+
+def synthetic_blobs(n_rows: int, true_k: int, n_dims: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.uniform(-10, 10, size=(true_k, n_dims))
+    return centres[rng.integers(true_k, size=n_rows)] + rng.normal(size=(n_rows, n_dims))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--true-k", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--max-clusters", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'true k':>6} | {'exhaustive k':>12} {'time':>8} | {'fast k':>6} {'time':>8} {'speedup':>8}")
+    for n_rows in args.rows:
+        for true_k in args.true_k:
+            embeddings = synthetic_blobs(n_rows, true_k)
+
+            start = time.perf_counter()
+            k_exhaustive = get_optimal_clusters(embeddings, args.max_clusters, search="exhaustive")
+            t_exhaustive = time.perf_counter() - start
+
+            start = time.perf_counter()
+            k_fast = get_optimal_clusters(embeddings, args.max_clusters, search="fast", n_jobs=args.jobs)
+            t_fast = time.perf_counter() - start
+
+            print(
+                f"{n_rows:>6} {true_k:>6} | {k_exhaustive:>12} {t_exhaustive:>7.2f}s | "
+                f"{k_fast:>6} {t_fast:>7.2f}s {t_exhaustive / t_fast:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
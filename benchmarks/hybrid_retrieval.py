@@ -0,0 +1,79 @@
+"""
+Latency and recall of hybrid (BM25 + dense) retrieval against dense-only retrieval.
+
+Queries are generated from a published index: for sampled chunks, a keyword query made of the
+chunk's rarest terms and a natural-language query made of its opening words. A query counts as
+a hit when its source chunk is among the retrieved documents.
+
+    python -m benchmarks.hybrid_retrieval --db-path faiss_db_raptor --queries 200
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from db.bm25 import BM25Index, tokenize
+from db.context_packing import PackedRetriever
+from db.db_helper import _embedding_model
+from db.docstore import load_vector_store
+from db.manifest import resolve_index_dir
+
+
+def make_queries(vector_store, lexical: BM25Index, n_queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    n_docs = len(vector_store.index_to_docstore_id)
+    queries = []
+    for position in rng.sample(range(n_docs), min(n_queries, n_docs)):
+        text = vector_store.docstore.search(vector_store.index_to_docstore_id[position]).page_content
+        terms = sorted(
+            {t for t in tokenize(text) if t in lexical.vocabulary},
+            key=lambda t: -lexical.idf(lexical.vocabulary[t]),
+        )
+        if terms:
+            queries.append(("keyword", " ".join(terms[:2]), text))
+        queries.append(("natural", " ".join(text.split()[:12]), text))
+    return queries
+
+
+def run(retriever: PackedRetriever, queries):
+    results = {}
+    for kind, query, expected in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        hit = any(doc.page_content == expected for doc in docs)
+        results.setdefault(kind, []).append((elapsed, hit))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-path", default="faiss_db_raptor")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index_dir = resolve_index_dir(args.db_path)
+    lexical = BM25Index.load(index_dir)
+    if lexical is None:
+        raise SystemExit(f"No BM25 index in {index_dir}; rebuild the index with save_to_faiss first")
+    vector_store = load_vector_store(index_dir, _embedding_model())
+    queries = make_queries(vector_store, lexical, args.queries)
+
+    modes = {
+        "dense": PackedRetriever(vectorstore=vector_store),
+        "hybrid": PackedRetriever(vectorstore=vector_store, lexical_index=lexical),
+    }
+    print(f"{'mode':<8} {'queries':<8} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, retriever in modes.items():
+        for kind, rows in run(retriever, queries).items():
+            latencies = [r[0] for r in rows]
+            recall = np.mean([r[1] for r in rows])
+            print(
+                f"{mode:<8} {kind:<8} {recall:>7.3f} {np.percentile(latencies, 50):>8.2f} "
+                f"{np.percentile(latencies, 99):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
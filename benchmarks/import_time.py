@@ -0,0 +1,130 @@
+"""
+Import-time regression check for the serving entry points, based on `python -X importtime`.
+
+Imports each target in a fresh interpreter, reports the median total import time and the
+slowest modules, and fails (exit code 1) when:
+  - a build-only or unused-provider module is imported (umap, numba, sklearn, the clustering
+    module, torch, or an LLM client SDK), or
+  - the median import time exceeds the baseline (by default the committed
+    `benchmarks/import_baseline.json`) by more than `--tolerance`.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --save-baseline benchmarks/import_baseline.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = ["app", "server"]
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "import_baseline.json")
+# Imported only by index builds or on a provider's first use, never at serving start-up
+FORBIDDEN = (
+    "umap",
+    "numba",
+    "sklearn",
+    "llm.clustering",
+    "torch",
+    "sentence_transformers",
+    "langchain_openai",
+    "langchain_groq",
+    "langchain_google_genai",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(code: str) -> List[Tuple[str, int, int, int]]:
+    """
+    (module, self us, cumulative us, depth) for every module imported while running `code`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"{code} failed:\n{result.stderr[-2000:]}")
+    profile = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            profile.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return profile
+
+
+def forbidden_imports(profile) -> List[str]:
+    return sorted(
+        {
+            module
+            for module, _, _, _ in profile
+            if any(module == name or module.startswith(name + ".") for name in FORBIDDEN)
+        }
+    )
+
+
+def measure(target: str, runs: int) -> Dict:
+    # Interpreter start-up imports are the same for every target; leave them out
+    startup = {module for module, _, _, _ in import_profile("pass")}
+    totals = []
+    for _ in range(runs):
+        profile = [row for row in import_profile(f"import {target}") if row[0] not in startup]
+        totals.append(sum(cumulative for _, _, cumulative, depth in profile if depth == 0) / 1000)
+    slowest = sorted(profile, key=lambda row: -row[1])[:10]
+    return {
+        "median_ms": sorted(totals)[len(totals) // 2],
+        "modules": len(profile),
+        "forbidden": forbidden_imports(profile),
+        "slowest": [(module, self_us / 1000) for module, self_us, _, _ in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE, help="JSON of median import times to compare against; '' skips the check"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    parser.add_argument("--save-baseline", help="Write the measured medians to this JSON file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {target: ms for target, ms in json.load(f).items() if not target.startswith("_")}
+
+    failures = []
+    medians = {}
+    for target in args.targets:
+        result = measure(target, args.runs)
+        medians[target] = result["median_ms"]
+        print(f"import {target}: {result['median_ms']:.0f} ms median, {result['modules']} modules")
+        for module, self_ms in result["slowest"]:
+            print(f"    {self_ms:8.1f} ms  {module}")
+        if result["forbidden"]:
+            failures.append(f"{target} imports {', '.join(result['forbidden'])}")
+        if target in baseline and result["median_ms"] > baseline[target] * (1 + args.tolerance):
+            failures.append(
+                f"{target} import time {result['median_ms']:.0f} ms exceeds baseline "
+                f"{baseline[target]:.0f} ms by more than {args.tolerance:.0%}"
+            )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"_note": "Median import times in ms, measured by benchmarks.import_time", **medians}, f, indent=2)
+    if failures:
+        print("\n".join(["FAILED:"] + failures))
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+End-to-end latency benchmark of every pipeline stage, offline.
+
+Generates a synthetic PDF corpus, swaps `get_llm` for `FakeChatModel` with the given latency
+and token rate, and times each stage separately: extraction (per page), chunking (per page),
+embedding (per batch), clustering (per run), summarization (per cluster), index build (per
+build), retrieval (per query), rewrite (per follow-up LLM call) and generation (per answer,
+plus time to first token). Percentiles and the peak RSS reached by the end of each stage are
+written to JSON; `--compare` prints the ratio against an earlier run, e.g. another commit.
+
+    python -m benchmarks.pipeline --docs 20 --pages 5 --output bench.json
+    python -m benchmarks.pipeline --output new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.synthetic_corpus import generate_corpus
+
+STAGES = [
+    "extraction",
+    "chunking",
+    "embedding",
+    "clustering",
+    "summarization",
+    "index_build",
+    "retrieval",
+    "rewrite",
+    "generation",
+    "time_to_first_token",
+]
+QUESTIONS = [
+    "How can I calm down during a panic attack?",
+    "What helps with low mood and no energy?",
+    "How do I set boundaries when work pressure builds up?",
+    "What does grief feel like months after a loss?",
+    "How do I start a mindfulness practice?",
+    "Why do I keep waking up at night?",
+]
+FOLLOW_UPS = ["Can you explain that in more detail?", "What about at work?", "Why does that help?"]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageRecorder:
+    """Latency samples per stage and the peak RSS at the end of each stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.peak_rss: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds * 1000)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        yield
+        self.add(stage, time.perf_counter() - start)
+
+    def finish(self, stage: str):
+        self.peak_rss[stage] = peak_rss_mb()
+
+    def report(self) -> Dict[str, Dict]:
+        report = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            report[stage] = {
+                "n": len(samples),
+                "mean_ms": float(np.mean(samples)),
+                "p50_ms": float(np.percentile(samples, 50)),
+                "p95_ms": float(np.percentile(samples, 95)),
+                "p99_ms": float(np.percentile(samples, 99)),
+                "peak_rss_mb": self.peak_rss.get(stage),
+            }
+        return report
+
+
+class ChainStageTimer(BaseCallbackHandler):
+    """
+    Times chat-model calls. Without a fixed `stage`, calls that start before the retriever
+    of a turn has finished are question rewrites and later ones generate the answer.
+    """
+
+    def __init__(self, recorder: StageRecorder, stage: Optional[str] = None):
+        self.recorder = recorder
+        self.stage = stage
+        self.retrieved = False
+        self._starts: Dict = {}
+
+    def new_turn(self):
+        self.retrieved = False
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        stage = self.stage or ("generation" if self.retrieved else "rewrite")
+        self._starts[run_id] = (stage, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        stage, start = self._starts.pop(run_id, (None, None))
+        if stage is not None:
+            self.recorder.add(stage, time.perf_counter() - start)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self.retrieved = True
+
+
+@contextmanager
+def fake_llm(model: FakeChatModel):
+    """Make every `get_llm` call return `model`."""
+    import llm.clustering
+    import llm.langchain_utils
+
+    originals = (llm.langchain_utils.get_llm, llm.clustering.get_llm)
+    llm.langchain_utils.get_llm = llm.clustering.get_llm = lambda provider="gemini": model
+    try:
+        yield
+    finally:
+        llm.langchain_utils.get_llm, llm.clustering.get_llm = originals
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args, work_dir: str) -> StageRecorder:
+    # Cold caches in the scratch directory, so every stage does its real work
+    os.environ["EMBEDDING_CACHE_DIR"] = os.path.join(work_dir, "embeddings")
+    os.environ["SUMMARY_CACHE_PATH"] = ""
+    os.environ["ANSWER_CACHE"] = "0"
+
+    from db.db_helper import load_faiss_vector_store, save_to_faiss
+    from llm.clustering import SUMMARY_TEMPLATE, perform_clustering
+    from llm.embedding_store import get_cached_embeddings
+    from llm.embedding_backends import create_embeddings, embedding_cache_name
+    from llm.langchain_utils import DEFAULT_EMBEDDING_MODEL, create_conversational_chain
+    from llm.streaming import StreamStats, stream_answer
+    from llm.summarization import SummarizationExecutor
+    from mental_healthcare_chatbot.document_utils import iter_pdf_pages, iter_token_chunks
+
+    recorder = StageRecorder()
+    data_dir = os.path.join(work_dir, "data")
+    generate_corpus(data_dir, args.docs, args.pages, args.seed)
+
+    pages = []
+    page_iter = iter_pdf_pages(data_dir)
+    while True:
+        start = time.perf_counter()
+        page = next(page_iter, None)
+        if page is None:
+            break
+        recorder.add("extraction", time.perf_counter() - start)
+        pages.append(page)
+    recorder.finish("extraction")
+
+    chunks = []
+    for page in pages:
+        with recorder.time("chunking"):
+            chunks.extend(iter_token_chunks([page]))
+    texts = [chunk.page_content for chunk in chunks]
+    recorder.finish("chunking")
+
+    embeddings = get_cached_embeddings(
+        embedding_cache_name(DEFAULT_EMBEDDING_MODEL), lambda: create_embeddings(DEFAULT_EMBEDDING_MODEL)
+    )
+    embeddings.embeddings.embed_query("warm-up")  # load the model outside the timed batches
+    vectors = []
+    for start in range(0, len(texts), args.batch_size):
+        with recorder.time("embedding"):
+            vectors.append(embeddings.embed_array(texts[start:start + args.batch_size]))
+    vectors = np.concatenate(vectors)
+    recorder.finish("embedding")
+
+    for _ in range(args.repeats):
+        with recorder.time("clustering"):
+            clusters = perform_clustering(vectors, 10, 0.1)
+    recorder.finish("clustering")
+
+    members: Dict[int, List[str]] = {}
+    for text, labels in zip(texts, clusters):
+        for label in labels:
+            members.setdefault(int(label), []).append(text)
+    contexts = ["--- --- \n --- --- ".join(group) for group in members.values()]
+    model = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second, seed=args.seed)
+    chain = (ChatPromptTemplate.from_template(SUMMARY_TEMPLATE) | model | StrOutputParser()).with_config(
+        callbacks=[ChainStageTimer(recorder, stage="summarization")]
+    )
+    summaries = SummarizationExecutor.from_env().map(chain, contexts)
+    recorder.finish("summarization")
+
+    # Summary vectors come from the cache too, so the index-build stage times FAISS only
+    embeddings.embed_array(summaries)
+    db_path = os.path.join(work_dir, "faiss_db")
+    for _ in range(args.repeats):
+        with recorder.time("index_build"):
+            save_to_faiss(texts + summaries, db_path)
+    recorder.finish("index_build")
+
+    retriever = load_faiss_vector_store(db_path)
+    retriever.invoke("warm-up")
+    for i in range(args.queries):
+        with recorder.time("retrieval"):
+            retriever.invoke(QUESTIONS[i % len(QUESTIONS)])
+    recorder.finish("retrieval")
+
+    timer = ChainStageTimer(recorder)
+    with fake_llm(model):
+        conversation_chain = create_conversational_chain(retriever).with_config(callbacks=[timer])
+    for i in range(args.queries):
+        history = []
+        for question in (QUESTIONS[i % len(QUESTIONS)], FOLLOW_UPS[i % len(FOLLOW_UPS)]):
+            timer.new_turn()
+            stats = StreamStats()
+            for _ in stream_answer(conversation_chain, {"input": question, "chat_history": history}, stats):
+                pass
+            if stats.time_to_first_token is not None:
+                recorder.add("time_to_first_token", stats.time_to_first_token)
+            history += [HumanMessage(content=question), AIMessage(content=stats.answer)]
+    recorder.finish("rewrite")
+    recorder.finish("generation")
+    recorder.finish("time_to_first_token")
+    return recorder
+
+
+def compare(report: Dict, baseline: Dict):
+    print(f"{'stage':<20} {'p50 ratio':>10} {'p99 ratio':>10} {'rss ratio':>10}")
+    for stage, row in report["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base:
+            continue
+        ratios = [
+            row[key] / base[key] if base.get(key) else float("nan")
+            for key in ("p50_ms", "p99_ms", "peak_rss_mb")
+        ]
+        print(f"{stage:<20} {ratios[0]:>10.2f} {ratios[1]:>10.2f} {ratios[2]:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs of the clustering and index-build stages")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", help="JSON report of an earlier run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+        recorder = run(args, work_dir)
+
+    report = {
+        "commit": git_commit(),
+        "config": vars(args),
+        "stages": recorder.report(),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'stage':<20} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    for stage, row in report["stages"].items():
+        print(
+            f"{stage:<20} {row['n']:>5} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+            f"{row['p99_ms']:>9.2f} {row['peak_rss_mb'] or 0:>8.1f}"
+        )
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Offline benchmark for hedged requests and failover across chat model providers.
+
+Two FakeChatModel providers with scripted latency distributions stand in for real ones: a
+fast primary with a slow throttled tail and a slower but steady secondary. Each scenario
+sends the same requests to the primary alone and to a `ProviderPool` over both, and reports
+time-to-first-token percentiles, errors, hedges and failovers. In the outage scenario the
+primary fails every call, so its circuit breaker should take it out of rotation.
+
+    python -m benchmarks.provider_pool --requests 200 --tail-rate 0.05 --tail-latency 2
+    python -m benchmarks.provider_pool --mode async
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_llm import FakeChatModel
+from llm.provider_pool import ProviderPool
+
+
+def time_to_first_token(model, messages) -> float:
+    start = time.perf_counter()
+    for _ in model.stream(messages):
+        return time.perf_counter() - start
+    raise RuntimeError("empty answer")
+
+
+async def atime_to_first_token(model, messages) -> float:
+    start = time.perf_counter()
+    async for _ in model.astream(messages):
+        return time.perf_counter() - start
+    raise RuntimeError("empty answer")
+
+
+def load(model, requests: int, mode: str):
+    latencies, errors = [], 0
+    for i in range(requests):
+        messages = [HumanMessage(content=f"How can I sleep better? ({i})")]
+        try:
+            if mode == "async":
+                latencies.append(asyncio.run(atime_to_first_token(model, messages)))
+            else:
+                latencies.append(time_to_first_token(model, messages))
+        except Exception:
+            errors += 1
+    return latencies, errors
+
+
+def providers(args, primary_error_rate: float):
+    primary = FakeChatModel(
+        latency=args.latency,
+        jitter=args.jitter,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+        error_rate=primary_error_rate,
+        seed=args.seed,
+    )
+    secondary = FakeChatModel(
+        latency=args.secondary_latency, jitter=args.jitter, seed=args.seed + 1
+    )
+    return primary, secondary
+
+
+def report(label: str, latencies, errors: int, extra: str = ""):
+    if latencies:
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    else:
+        p50 = p95 = p99 = float("nan")
+    print(f"  {label:<14} p50 {p50:7.1f} ms  p95 {p95:7.1f} ms  p99 {p99:7.1f} ms  errors {errors:>4}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Primary seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="Share of slow primary calls")
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    parser.add_argument("--secondary-latency", type=float, default=0.35)
+    parser.add_argument("--hedge-percentile", type=float, default=95.0)
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for scenario, error_rate in (("slow tail", 0.0), ("primary outage", 1.0)):
+        print(f"{scenario}:")
+        primary, _ = providers(args, error_rate)
+        report("primary only", *load(primary, args.requests, args.mode))
+
+        primary, secondary = providers(args, error_rate)
+        pool = ProviderPool(
+            providers={"primary": primary, "secondary": secondary},
+            hedge_percentile=args.hedge_percentile,
+            hedge_delay=args.latency * 2,
+            reset_timeout=60.0,
+        )
+        latencies, errors = load(pool, args.requests, args.mode)
+        stats = pool.stats()
+        report(
+            "pool",
+            latencies,
+            errors,
+            f"hedges {stats['hedges']}  failovers {stats['failovers']}  "
+            f"primary calls {primary.calls} wins {stats['primary']['wins']} ({stats['primary']['breaker']})  "
+            f"secondary calls {secondary.calls} wins {stats['secondary']['wins']}",
+        )
+
+
+if __name__ == "__main__":
+    main()
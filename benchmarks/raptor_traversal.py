@@ -0,0 +1,92 @@
+"""
+Latency and recall of RAPTOR tree traversal against collapsed-tree search as the corpus grows.
+
+A synthetic tree is built per corpus size: leaf vectors are drawn around topic centres and
+every level above is k-means over the level below, each centroid standing in for the summary
+embedding of its cluster (about `--branching` children per summary). Collapsed search is an
+exact FAISS search over all nodes; tree traversal is `RaptorTree.traverse`. Recall is the
+share of each query's exact top-k leaves that a mode returns.
+
+    python -m benchmarks.raptor_traversal --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from db.raptor_tree import RaptorTree
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_tree(n_leaves: int, dim: int, branching: int, seed: int = 0):
+    """Node vectors (leaves first) and the tree over their positions."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(n_leaves // 50, 1), dim))
+    leaves = centres[rng.integers(len(centres), size=n_leaves)] + 0.6 * rng.normal(size=(n_leaves, dim))
+    levels = [_normalize(leaves).astype(np.float32)]
+    positions = [np.arange(n_leaves)]
+    children = {}
+    next_position = n_leaves
+    while len(levels[-1]) > branching:
+        below = levels[-1]
+        k = max(len(below) // branching, 1)
+        kmeans = faiss.Kmeans(dim, k, niter=10, seed=seed)
+        kmeans.train(below)
+        _, assignment = kmeans.index.search(below, 1)
+        level_positions = np.arange(next_position, next_position + k)
+        for row, cluster in enumerate(assignment[:, 0]):
+            children.setdefault(int(level_positions[cluster]), []).append(int(positions[-1][row]))
+        next_position += k
+        levels.append(_normalize(kmeans.centroids).astype(np.float32))
+        positions.append(level_positions)
+    vectors = np.concatenate(levels)
+    return vectors, RaptorTree([int(p) for p in positions[-1]], children)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--branching", type=int, default=10)
+    parser.add_argument("--beam-width", type=int, default=4)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'leaves':>8} {'nodes':>8} {'mode':<10} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_leaves in args.sizes:
+        vectors, tree = make_tree(n_leaves, args.dim, args.branching)
+        index = faiss.IndexFlatIP(args.dim)
+        index.add(vectors)
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(n_leaves, size=args.queries)]
+        queries = _normalize(queries + 0.05 * rng.normal(size=queries.shape)).astype(np.float32)
+        truth = np.argsort(-(queries @ vectors[:n_leaves].T), axis=1)[:, : args.k]
+
+        def collapsed(query):
+            _, ids = index.search(query[None, :], args.fetch_k)
+            return ids[0]
+
+        def traversal(query):
+            return tree.traverse(query, lambda positions: vectors[positions], args.beam_width)
+
+        for mode, search in (("collapsed", collapsed), ("tree", traversal)):
+            latencies, recalls = [], []
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                found = search(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(set(expected.tolist()) & set(int(p) for p in found)) / args.k)
+            print(
+                f"{n_leaves:>8} {len(vectors):>8} {mode:<10} {np.mean(recalls):>7.3f} "
+                f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Synthetic PDF corpus for offline benchmarks.
+
+Writes plain-text PDFs (Helvetica, one text stream per page) without any PDF library, so
+extraction with `PyPDFLoader` can be measured on reproducible input.
+
+    python -m benchmarks.synthetic_corpus --out bench_data --docs 20 --pages 5
+"""
+import argparse
+import os
+import random
+from typing import List
+
+TOPICS = {
+    "anxiety": "worry tension panic breathing grounding exposure avoidance heartbeat restlessness",
+    "depression": "mood sadness energy sleep appetite hopelessness activation routine withdrawal",
+    "stress": "workload pressure burnout cortisol boundaries rest recovery deadlines balance",
+    "grief": "loss mourning memories acceptance support waves anniversary loneliness meaning",
+    "mindfulness": "attention present awareness breath body scan acceptance meditation calm",
+    "sleep": "insomnia hygiene schedule caffeine screens bedtime waking melatonin naps",
+    "relationships": "communication trust conflict listening empathy support family friends",
+    "therapy": "counsellor cbt sessions goals homework thoughts behaviours reflection progress",
+}
+FILLER = "the a of to and in is that for with as can often helps people when may".split()
+
+LINES_PER_PAGE = 48
+WORDS_PER_LINE = 14
+
+
+def _sentence(rng: random.Random, topic: str) -> str:
+    words = TOPICS[topic].split()
+    n_words = rng.randint(8, 20)
+    sentence = [rng.choice(words) if rng.random() < 0.45 else rng.choice(FILLER) for _ in range(n_words)]
+    return " ".join(sentence).capitalize() + "."
+
+
+def make_pages(n_pages: int, seed: int = 0) -> List[List[str]]:
+    """Pages of text lines, each page centred on one topic."""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(n_pages):
+        topic = rng.choice(sorted(TOPICS))
+        words = " ".join(_sentence(rng, topic) for _ in range(LINES_PER_PAGE)).split()
+        pages.append(
+            [" ".join(words[i:i + WORDS_PER_LINE]) for i in range(0, len(words), WORDS_PER_LINE)][:LINES_PER_PAGE]
+        )
+    return pages
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """
+    Write a minimal PDF with one page per entry of `pages`, each a list of text lines.
+    """
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {len(pages)} >>".encode(),
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    for page_id, lines in zip(page_ids, pages):
+        content = ("BT /F1 10 Tf 14 TL 50 770 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET").encode()
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        ).encode()
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number in range(1, len(objects) + 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def generate_corpus(directory: str, n_docs: int, pages_per_doc: int, seed: int = 0) -> List[str]:
+    """
+    Write `n_docs` PDFs of `pages_per_doc` pages into `directory`.
+
+    Returns:
+        List[str]: paths of the written files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        path = os.path.join(directory, f"synthetic_{i:04d}.pdf")
+        write_pdf(path, make_pages(pages_per_doc, seed=seed * 100003 + i))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_data")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(args.out, args.docs, args.pages, args.seed)
+    print(f"Wrote {len(paths)} PDFs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
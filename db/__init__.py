@@ -1 +1,2 @@
-from .db_helper import save_to_faiss, load_faiss_vector_store
+from .db_helper import save_to_faiss, update_faiss, load_faiss_vector_store
+from .context_packing import PackedRetriever, packing_stats
@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+BM25_DIR = "bm25"
+
+# Keeps hotline numbers ("1-800-273-8255", "988") and acronyms ("ptsd", "ssri") as single terms
+_TERM_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its me my of on or our "
+    "so than that the their them then there these they this to was we were what when which who "
+    "will with you your".split()
+)
+_QUESTION_WORDS = frozenset(
+    "what how why when where who which can could should would do does is are am will tell explain".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of a text, without stopwords."""
+    return [t for t in _TERM_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def build_bm25(texts: List[str], out_dir: str):
+    """
+    Write a BM25 inverted index over `texts` to `out_dir`.
+
+    Postings are stored term-major in flat .npy arrays (CSR layout) that are memory-mapped on
+    load; document IDs are positions in `texts`, which match the FAISS index positions.
+    """
+    postings = {}
+    doc_lengths = np.zeros(len(texts), dtype=np.int32)
+    for doc_id, text in enumerate(texts):
+        terms = Counter(tokenize(text))
+        doc_lengths[doc_id] = sum(terms.values())
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append((doc_id, tf))
+
+    vocabulary = sorted(postings)
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    for i, term in enumerate(vocabulary):
+        offsets[i + 1] = offsets[i] + len(postings[term])
+    doc_ids = np.empty(offsets[-1], dtype=np.int32)
+    tfs = np.empty(offsets[-1], dtype=np.uint16)
+    for i, term in enumerate(vocabulary):
+        entries = postings[term]
+        doc_ids[offsets[i]:offsets[i + 1]] = [d for d, _ in entries]
+        tfs[offsets[i]:offsets[i + 1]] = [min(tf, 65535) for _, tf in entries]
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(out_dir, "tfs.npy"), tfs)
+    np.save(os.path.join(out_dir, "doc_lengths.npy"), doc_lengths)
+    with open(os.path.join(out_dir, "vocabulary.json"), "w") as f:
+        json.dump(vocabulary, f)
+
+
+class BM25Index:
+    """
+    Read-only BM25 index written by `build_bm25`.
+
+    Args:
+        index_dir (str): Directory of the index files.
+        k1 (float): Term-frequency saturation.
+        b (float): Document-length normalization.
+    """
+
+    def __init__(self, index_dir: str, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(index_dir, "doc_ids.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(index_dir, "tfs.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(index_dir, "doc_lengths.npy"))
+        with open(os.path.join(index_dir, "vocabulary.json")) as f:
+            self.vocabulary = {term: i for i, term in enumerate(json.load(f))}
+        self.n_docs = len(self.doc_lengths)
+        self.avg_length = float(self.doc_lengths.mean()) if self.n_docs else 0.0
+        self._length_norm = k1 * (1 - b + b * self.doc_lengths / (self.avg_length or 1.0))
+
+    @classmethod
+    def load(cls, index_dir: str):
+        """Load the BM25 index stored next to a FAISS index, or None if there is none."""
+        path = os.path.join(index_dir, BM25_DIR)
+        return cls(path) if os.path.exists(os.path.join(path, "offsets.npy")) else None
+
+    def idf(self, term_id: int) -> float:
+        df = int(self.offsets[term_id + 1] - self.offsets[term_id])
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Top `k` (document position, BM25 score) pairs for the query.
+        """
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            scores[docs] += self.idf(term_id) * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def is_keyword_query(self, query: str, max_terms: int = 4, min_idf: float = 2.0) -> bool:
+        """
+        Whether a query is a plain keyword lookup that lexical search alone answers well:
+        a few terms, not phrased as a question, with at least one rare term, number or acronym.
+        """
+        words = query.split()
+        if not words or len(words) > max_terms or "?" in query:
+            return False
+        if words[0].lower() in _QUESTION_WORDS:
+            return False
+        if any(any(c.isdigit() for c in w) or (w.isupper() and len(w) > 1) for w in words):
+            return True
+        return any(
+            self.idf(self.vocabulary[t]) >= min_idf for t in tokenize(query) if t in self.vocabulary
+        )
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked lists of document positions into one by reciprocal rank fusion.
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return scores.most_common()
@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field
+
+from llm.summarization import estimate_tokens
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .raptor_tree import RaptorTree
+
+RETRIEVAL_MODES = ("collapsed", "tree")
+
+
+class PackingStats:
+    """
+    Prompt-token counts of retrieved context before and after packing.
+    """
+
+    def __init__(self):
+        self.last: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {"requests": 0, "tokens_before": 0, "tokens_after": 0}
+        self._lock = threading.Lock()
+
+    def record(self, tokens_before: int, tokens_after: int, docs_before: int, docs_after: int):
+        with self._lock:
+            self.last = {
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after,
+                "docs_before": docs_before,
+                "docs_after": docs_after,
+            }
+            self.totals["requests"] += 1
+            self.totals["tokens_before"] += tokens_before
+            self.totals["tokens_after"] += tokens_after
+
+
+packing_stats = PackingStats()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def select_context(
+    query_vector: Optional[np.ndarray],
+    doc_vectors: np.ndarray,
+    doc_tokens: List[int],
+    token_budget: int,
+    max_docs: int,
+    lambda_mult: float = 0.5,
+    duplicate_threshold: float = 0.92,
+    relevance: Optional[np.ndarray] = None,
+    related: Optional[List[List[int]]] = None,
+) -> List[int]:
+    """
+    Pick candidates by maximal marginal relevance, skipping redundant ones, within a token budget.
+
+    A candidate whose cosine similarity to an already selected document reaches
+    `duplicate_threshold` is dropped as a near-duplicate; in the RAPTOR index this is typically
+    a summary next to the pages it summarizes. Candidates that no longer fit in the remaining
+    budget are skipped, so smaller relevant chunks can still fill it.
+
+    Relevance is the cosine similarity to `query_vector` unless `relevance` scores in [0, 1]
+    are given (e.g. fused lexical/dense ranks), in which case `query_vector` may be None.
+
+    `related` lists, per candidate, the candidates that are its RAPTOR parent or children; a
+    candidate is skipped once one of them is selected, whatever their cosine similarity.
+
+    Returns:
+        List[int]: indices of the selected candidates, in selection order.
+    """
+    doc_vectors = _normalize(doc_vectors)
+    if relevance is None:
+        relevance = doc_vectors @ _normalize(query_vector)
+    similarity = doc_vectors @ doc_vectors.T
+
+    selected: List[int] = []
+    remaining = set(range(len(doc_vectors)))
+    budget = token_budget
+    while remaining and len(selected) < max_docs:
+        redundancy = (
+            similarity[:, selected].max(axis=1) if selected else np.zeros(len(doc_vectors))
+        )
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        best = max(remaining, key=lambda i: scores[i])
+        remaining.discard(best)
+        if selected and redundancy[best] >= duplicate_threshold:
+            continue
+        if related is not None and any(j in selected for j in related[best]):
+            continue
+        if doc_tokens[best] > budget and selected:
+            continue
+        selected.append(best)
+        budget -= doc_tokens[best]
+    return selected
+
+
+def _related(docs: List[Document]) -> List[List[int]]:
+    """Indices of each document's RAPTOR parent and children among `docs`."""
+    index_of = {doc.metadata["id"]: i for i, doc in enumerate(docs) if "id" in doc.metadata}
+    related: List[List[int]] = [[] for _ in docs]
+    for i, doc in enumerate(docs):
+        for child_id in doc.metadata.get("child_ids", []):
+            j = index_of.get(child_id)
+            if j is not None:
+                related[i].append(j)
+                related[j].append(i)
+    return related
+
+
+class PackedRetriever(BaseRetriever):
+    """
+    FAISS retriever that over-fetches, removes redundant context and packs it to a token budget.
+
+    Sits between retrieval and `create_stuff_documents_chain`, so the stuffed prompt carries
+    at most `token_budget` estimated tokens of diverse context.
+
+    With a `lexical_index`, dense and BM25 candidates are combined by reciprocal rank fusion,
+    and plain keyword lookups (hotline numbers, acronyms, medication names) are answered from
+    BM25 alone without running the embedding model.
+
+    `mode` selects how dense candidates are found: "collapsed" searches every chunk and
+    summary of the RAPTOR tree at once; "tree" starts from the top-level summaries and only
+    descends into the `beam_width` best subtrees at each level (requires `tree`). In tree mode
+    BM25 only serves the keyword fast path.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: FAISS
+    fetch_k: int = 20
+    max_docs: int = 6
+    token_budget: int = 1500
+    lambda_mult: float = 0.5
+    duplicate_threshold: float = 0.92
+    lexical_index: Optional[BM25Index] = None
+    rrf_k: int = 60
+    tree: Optional[RaptorTree] = None
+    mode: str = "collapsed"
+    beam_width: int = 4
+    stats: PackingStats = Field(default_factory=lambda: packing_stats)
+
+    @classmethod
+    def from_env(
+        cls,
+        vectorstore: FAISS,
+        lexical_index: Optional[BM25Index] = None,
+        tree: Optional[RaptorTree] = None,
+    ) -> "PackedRetriever":
+        mode = os.getenv("RETRIEVAL_MODE", "collapsed")
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"RETRIEVAL_MODE must be one of {RETRIEVAL_MODES}, got {mode!r}")
+        return cls(
+            vectorstore=vectorstore,
+            fetch_k=int(os.getenv("CONTEXT_FETCH_K", "20")),
+            max_docs=int(os.getenv("CONTEXT_MAX_DOCS", "6")),
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+            lexical_index=lexical_index,
+            tree=tree,
+            mode=mode if tree is not None else "collapsed",
+            beam_width=int(os.getenv("RAPTOR_BEAM_WIDTH", "4")),
+        )
+
+    def _dense_positions(self, query_vector: np.ndarray) -> List[int]:
+        _, ids = self.vectorstore.index.search(query_vector[None, :].astype(np.float32), self.fetch_k)
+        return [int(i) for i in ids[0] if i != -1]
+
+    def _load(self, positions: List[int]) -> List[Document]:
+        return [
+            self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i])
+            for i in positions
+        ]
+
+    def _vectors(self, positions: List[int], docs: Optional[List[Document]] = None) -> np.ndarray:
+        try:
+            return np.stack([self.vectorstore.index.reconstruct(i) for i in positions])
+        except RuntimeError:
+            # Index types without reconstruction (e.g. IVF without a direct map)
+            docs = docs if docs is not None else self._load(positions)
+            return np.asarray(
+                self.vectorstore.embeddings.embed_documents([d.page_content for d in docs]),
+                dtype=np.float32,
+            )
+
+    def _documents(self, positions: List[int]):
+        docs = self._load(positions)
+        return docs, self._vectors(positions, docs)
+
+    def _candidates(self, query: str, timings: Dict[str, float]):
+        """
+        Candidate positions with optional relevance scores, and the query vector if one was computed.
+        """
+        lexical = self.lexical_index
+        if lexical is not None and lexical.is_keyword_query(query):
+            hits = lexical.search(query, self.fetch_k)
+            if hits:
+                top = hits[0][1]
+                return [p for p, _ in hits], np.array([score / top for _, score in hits]), None
+
+        started = time.perf_counter()
+        query_vector = np.asarray(self.vectorstore.embeddings.embed_query(query), dtype=np.float32)
+        timings["query_embedding_ms"] = (time.perf_counter() - started) * 1000
+        if self.mode == "tree" and self.tree is not None:
+            return self.tree.traverse(query_vector, self._vectors, self.beam_width), None, query_vector
+
+        dense = self._dense_positions(query_vector)
+        if lexical is None:
+            return dense, None, query_vector
+
+        lexical_positions = [p for p, _ in lexical.search(query, self.fetch_k)]
+        fused = reciprocal_rank_fusion([dense, lexical_positions], self.rrf_k)[: self.fetch_k]
+        top = fused[0][1] if fused else 1.0
+        return [p for p, _ in fused], np.array([score / top for _, score in fused]), query_vector
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: Optional[CallbackManagerForRetrieverRun] = None
+    ) -> List[Document]:
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        positions, relevance, query_vector = self._candidates(query, timings)
+        searched = time.perf_counter()
+        timings["search_ms"] = (searched - started) * 1000 - timings.get("query_embedding_ms", 0.0)
+        if not positions:
+            self._report(run_manager, timings)
+            return []
+        docs, vectors = self._documents(positions)
+        tokens = [estimate_tokens(doc.page_content) for doc in docs]
+        selected = select_context(
+            query_vector,
+            vectors,
+            tokens,
+            self.token_budget,
+            self.max_docs,
+            self.lambda_mult,
+            self.duplicate_threshold,
+            relevance,
+            _related(docs),
+        )
+        self.stats.record(sum(tokens), sum(tokens[i] for i in selected), len(docs), len(selected))
+        timings["packing_ms"] = (time.perf_counter() - searched) * 1000
+        self._report(run_manager, timings)
+        return [docs[i] for i in selected]
+
+    @staticmethod
+    def _report(run_manager: Optional[CallbackManagerForRetrieverRun], timings: Dict[str, float]):
+        # Picked up by `llm.tracing.RequestTracer`; other handlers ignore the empty text
+        if run_manager is not None:
+            run_manager.on_text("", retrieval_timings=timings)
@@ -1,49 +1,233 @@
 import os
-import shutil
+from typing import Dict, List, Optional
 
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 
+from llm.embedding_backends import create_embeddings, embedding_cache_name
+from llm.embedding_batcher import BatchedEmbeddings
+from llm.embedding_store import get_cached_embeddings
+from llm.langchain_utils import DEFAULT_EMBEDDING_MODEL
+from .bm25 import BM25_DIR, BM25Index, build_bm25
+from .context_packing import PackedRetriever
+from .docstore import has_sqlite_docstore, load_editable_vector_store, load_vector_store
+from .faiss_index import (
+    DEFAULT_INDEX_FACTORY,
+    apply_search_params,
+    load_search_params,
+    rebuild_index,
+    resolve_index_factory,
+    save_search_params,
+)
+from .manifest import IndexManifest, chunk_ids, publish_index, resolve_index_dir
+from .raptor_tree import RaptorTree
 
-def save_to_faiss(docs_texts: list, db_path: str = "faiss_db_raptor"):
+
+def _embedding_model():
+    # Backend per EMBEDDING_BACKEND; the ONNX backends run without torch
+    return create_embeddings(DEFAULT_EMBEDDING_MODEL)
+
+
+def _build_embeddings():
+    # Reuse vectors already computed while building the RAPTOR tree
+    return get_cached_embeddings(embedding_cache_name(DEFAULT_EMBEDDING_MODEL), _embedding_model)
+
+
+def _publish(vector_store, embeddings, manifest: IndexManifest, db_path: str, index_config: dict):
+    """
+    Convert the flat store to the configured index type and publish it together with its
+    search parameters, a BM25 index over the same documents and the RAPTOR tree structure.
+    """
+    if index_config["index_factory"] != DEFAULT_INDEX_FACTORY:
+        rebuild_index(vector_store, embeddings, index_config["index_factory"])
+
+    def write_extra(index_dir: str):
+        save_search_params(index_dir, index_config["index_factory"], index_config["search_params"])
+        texts = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i]).page_content
+            for i in range(len(vector_store.index_to_docstore_id))
+        ]
+        build_bm25(texts, os.path.join(index_dir, BM25_DIR))
+        RaptorTree.write(vector_store, index_dir)
+
+    publish_index(vector_store, manifest, db_path, write_extra=write_extra)
+
+
+def save_to_faiss(
+    docs_texts: list,
+    db_path: str = "faiss_db_raptor",
+    index_factory: Optional[str] = None,
+    search_params: Optional[str] = None,
+):
     """
-    Initialize the language model and vector store.
+    Build a fresh FAISS vector store from the texts and publish it atomically.
+
+    The previously published index stays live until the new one is fully written.
 
     Parameters:
-        document_chunks (list): List of document chunks.
+        docs_texts (list): List of document chunks.
         db_path (str): path to store data in FAISS database locally.
+        index_factory (str): FAISS index-factory string such as 'HNSW32', 'IVF256,PQ32' or 'SQ8'.
+            Defaults to FAISS_INDEX_FACTORY, else an exact flat index.
+        search_params (str): query-time parameters such as 'efSearch=64', saved next to the index.
     """
-    # Clear out the existing database directory if it exists
-    if os.path.exists(db_path):
-        shutil.rmtre
+    embeddings = _build_embeddings()
+    faiss_vector_database = FAISS.from_texts(texts=docs_texts, embedding=embeddings)
 
-    # create embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-small-en-v1.5", model_kwargs={"device": "cpu"}
+    previous = IndexManifest.load(resolve_index_dir(db_path))
+    _publish(
+        faiss_vector_database,
+        embeddings,
+        IndexManifest(version=previous.version),
+        db_path,
+        resolve_index_factory(index_factory, search_params),
     )
-    faiss_vector_database = FAISS.from_texts(texts=docs_texts, embedding=embeddings)
 
-    faiss_vector_database.save_local(db_path)
+
+def update_faiss(
+    source_chunks: Dict[str, List[str]],
+    source_hashes: Dict[str, str],
+    db_path: str = "faiss_db_raptor",
+    remove_missing: bool = True,
+    index_factory: Optional[str] = None,
+    search_params: Optional[str] = None,
+    source_metadatas: Optional[Dict[str, List[dict]]] = None,
+) -> Dict[str, List[str]]:
+    """
+    Incrementally bring the FAISS vector store in line with the given sources.
+
+    Sources whose hash matches the manifest are left untouched. New sources are added, changed
+    sources have their old vectors deleted by ID and their new chunks added, and sources no
+    longer present are deleted when `remove_missing` is set. Only new or changed chunks are
+    embedded. Nothing is written when no source changed.
+
+    Every chunk is stored with its ID under the `id` metadata key, so RAPTOR summaries can
+    reference their children through `child_ids` metadata (see `raptor_summary_metadata`).
+
+    Parameters:
+        source_chunks (Dict[str, List[str]]): chunk texts per source key (e.g. PDF path).
+        source_hashes (Dict[str, str]): content hash per source key.
+        db_path (str): path of the FAISS database.
+        remove_missing (bool): delete sources that are in the manifest but not in `source_chunks`.
+        index_factory (str): FAISS index-factory string; see `save_to_faiss`.
+        search_params (str): query-time parameters saved next to the index.
+        source_metadatas (Dict[str, List[dict]]): optional metadata per chunk, per source key.
+
+    Returns:
+        Dict[str, List[str]]: source keys grouped under 'added', 'updated', 'deleted' and 'unchanged'.
+    """
+    embeddings = _build_embeddings()
+    index_dir = resolve_index_dir(db_path)
+    manifest = IndexManifest.load(index_dir)
+
+    if not manifest.sources:
+        # No manifest yet (fresh or pre-manifest index): start from an empty store
+        vector_store = None
+    else:
+        if has_sqlite_docstore(index_dir):
+            vector_store = load_editable_vector_store(index_dir, embeddings)
+        else:
+            vector_store = FAISS.load_local(
+                index_dir, embeddings, allow_dangerous_deserialization=True
+            )
+        saved = load_search_params(index_dir)
+        if saved and saved["index_factory"] != DEFAULT_INDEX_FACTORY:
+            # ANN indexes may not support removal; edit a flat copy and rebuild on publish
+            rebuild_index(vector_store, embeddings, DEFAULT_INDEX_FACTORY)
+
+    changes = {"added": [], "updated": [], "deleted": [], "unchanged": []}
+    stale_ids = []
+    new_texts, new_ids, new_metadatas = [], [], []
+    source_metadatas = source_metadatas or {}
+
+    for source, chunks in source_chunks.items():
+        source_hash = source_hashes[source]
+        previous_hash = manifest.source_hash(source)
+        if previous_hash == source_hash:
+            changes["unchanged"].append(source)
+            continue
+        changes["updated" if previous_hash else "added"].append(source)
+        stale_ids.extend(manifest.chunk_ids(source))
+        ids = chunk_ids(source, source_hash, len(chunks))
+        metadatas = source_metadatas.get(source) or [{} for _ in chunks]
+        new_texts.extend(chunks)
+        new_ids.extend(ids)
+        new_metadatas.extend({**metadata, "id": id_} for metadata, id_ in zip(metadatas, ids))
+        manifest.set_source(source, source_hash, ids)
+
+    if remove_missing:
+        for source in list(manifest.sources):
+            if source not in source_chunks:
+                changes["deleted"].append(source)
+                stale_ids.extend(manifest.chunk_ids(source))
+                manifest.remove_source(source)
+
+    if not stale_ids and not new_texts:
+        return changes
+
+    if stale_ids and vector_store is not None:
+        vector_store.delete(stale_ids)
+    if new_texts:
+        if vector_store is None:
+            vector_store = FAISS.from_texts(
+                texts=new_texts, embedding=embeddings, metadatas=new_metadatas, ids=new_ids
+            )
+        else:
+            vector_store.add_texts(new_texts, metadatas=new_metadatas, ids=new_ids)
+    if vector_store is None:
+        return changes
+
+    _publish(
+        vector_store, embeddings, manifest, db_path, resolve_index_factory(index_factory, search_params)
+    )
+    return changes
 
 
 def load_faiss_vector_store(db_directory_path: str = "faiss_db_raptor"):
     """
     Load FAISS vector store.
 
+    Published indexes are memory-mapped and their documents are read lazily from SQLite
+    (set FAISS_MMAP=0 to read the index into RAM instead). Indexes saved before the
+    SQLite docstore existed fall back to LangChain's pickle loader.
+
+    The returned retriever over-fetches, drops redundant chunks and packs the context to
+    CONTEXT_TOKEN_BUDGET tokens (see `PackedRetriever`); CONTEXT_PACKING=0 returns LangChain's
+    plain top-k retriever instead. When the index has a BM25 index next to it, retrieval is
+    hybrid lexical + dense unless HYBRID_RETRIEVAL=0. RETRIEVAL_MODE=tree switches to RAPTOR
+    tree traversal when the index was built with tree metadata.
+
+    Query embeddings of concurrent sessions are batched into shared forward passes (see
+    `BatchedEmbeddings`; EMBED_BATCHING=0 disables it).
+
     Parameters:
         db_directory_path (str): path to FAISS database.
     Returns:
         FAISS vector store
     """
     try:
-        embeddings = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-small-en-v1.5", model_kwargs={"device": "cpu"}
-        )
-        vector_store = FAISS.load_local(
-            db_directory_path, embeddings, allow_dangerous_deserialization=True
-        )
-
-        retriever = vector_store.as_retriever()
+        embeddings = BatchedEmbeddings.from_env(_embedding_model())
+        index_dir = resolve_index_dir(db_directory_path)
+        if has_sqlite_docstore(index_dir):
+            vector_store = load_vector_store(
+                index_dir, embeddings, mmap=os.getenv("FAISS_MMAP", "1") != "0"
+            )
+        else:
+            vector_store = FAISS.load_local(
+                index_dir, embeddings, allow_dangerous_deserialization=True
+            )
+        saved = load_search_params(index_dir)
+        if saved:
+            apply_search_params(vector_store.index, saved["search_params"])
+
+        if os.getenv("CONTEXT_PACKING", "1") != "0":
+            lexical_index = None
+            if os.getenv("HYBRID_RETRIEVAL", "1") != "0":
+                lexical_index = BM25Index.load(index_dir)
+            retriever = PackedRetriever.from_env(
+                vector_store, lexical_index, RaptorTree.load(index_dir)
+            )
+        else:
+            retriever = vector_store.as_retriever()
 
         return retriever
 
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Mapping, Union
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+def save_vector_store(vector_store: FAISS, index_dir: str):
+    """
+    Write a LangChain FAISS store as a raw FAISS index plus a SQLite docstore (no pickle).
+
+    Row `pos` of the docstore holds the document at position `pos` of the index.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    faiss.write_index(vector_store.index, os.path.join(index_dir, INDEX_FILE))
+
+    conn = sqlite3.connect(os.path.join(index_dir, DOCSTORE_FILE))
+    try:
+        conn.execute(
+            "CREATE TABLE docs (pos INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+
+        def rows():
+            for pos in range(len(vector_store.index_to_docstore_id)):
+                doc_id = vector_store.index_to_docstore_id[pos]
+                doc = vector_store.docstore.search(doc_id)
+                yield pos, doc_id, doc.page_content, json.dumps(doc.metadata)
+
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?)", rows())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class _ReadOnlyConnection:
+    """
+    One read-only SQLite connection, opened up front and shared by all threads under a lock.
+
+    Opening the file once keeps it readable after `publish_index` prunes its version directory
+    while this process is still serving from it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def fetchone(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore that fetches document texts from SQLite on demand.
+    """
+
+    def __init__(self, connection: _ReadOnlyConnection):
+        self._connection = connection
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._connection.fetchone("SELECT text, metadata FROM docs WHERE id = ?", (search,))
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        raise NotImplementedError("SQLiteDocstore is read-only")
+
+    def delete(self, ids: List) -> None:
+        raise NotImplementedError("SQLiteDocstore is read-only")
+
+
+class SQLiteIndexToDocstoreId(Mapping):
+    """
+    Lazy `index_to_docstore_id` mapping backed by the SQLite docstore.
+    """
+
+    def __init__(self, connection: _ReadOnlyConnection):
+        self._connection = connection
+        self._len = connection.fetchone("SELECT COUNT(*) FROM docs")[0]
+
+    def __getitem__(self, pos: int) -> str:
+        row = self._connection.fetchone("SELECT id FROM docs WHERE pos = ?", (int(pos),))
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._len))
+
+    def __len__(self) -> int:
+        return self._len
+
+
+def read_index(index_dir: str, mmap: bool = True) -> faiss.Index:
+    """
+    Read `index.faiss`, memory-mapping it when the index type supports it so that
+    processes loading the same index share page-cache memory.
+    """
+    path = os.path.join(index_dir, INDEX_FILE)
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def has_sqlite_docstore(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, DOCSTORE_FILE))
+
+
+def load_vector_store(index_dir: str, embeddings, mmap: bool = True) -> FAISS:
+    """
+    Open a published index for serving: memory-mapped FAISS index and lazily read docstore.
+    Startup cost does not depend on the corpus size and nothing is unpickled.
+    """
+    connection = _ReadOnlyConnection(os.path.join(index_dir, DOCSTORE_FILE))
+    return FAISS(
+        embedding_function=embeddings,
+        index=read_index(index_dir, mmap),
+        docstore=SQLiteDocstore(connection),
+        index_to_docstore_id=SQLiteIndexToDocstoreId(connection),
+    )
+
+
+def load_editable_vector_store(index_dir: str, embeddings) -> FAISS:
+    """
+    Load a published index fully into memory so documents can be added and deleted.
+    """
+    index = faiss.read_index(os.path.join(index_dir, INDEX_FILE))
+    conn = sqlite3.connect(os.path.join(index_dir, DOCSTORE_FILE))
+    try:
+        documents = {}
+        index_to_docstore_id = {}
+        for pos, doc_id, text, metadata in conn.execute(
+            "SELECT pos, id, text, metadata FROM docs ORDER BY pos"
+        ):
+            documents[doc_id] = Document(page_content=text, metadata=json.loads(metadata))
+            index_to_docstore_id[pos] = doc_id
+    finally:
+        conn.close()
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(documents),
+        index_to_docstore_id=index_to_docstore_id,
+    )
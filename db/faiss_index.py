@@ -0,0 +1,104 @@
+import json
+import os
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+SEARCH_PARAMS_FILE = "search_params.json"
+DEFAULT_INDEX_FACTORY = "Flat"
+MAX_TRAINING_VECTORS = 200_000
+
+
+def default_search_params(index_factory: str) -> str:
+    """
+    Reasonable query-time parameters for an index-factory string, in faiss ParameterSpace syntax.
+    """
+    params = []
+    if "IVF" in index_factory:
+        params.append("nprobe=16")
+    if "HNSW" in index_factory:
+        params.append("efSearch=64")
+    return ",".join(params)
+
+
+def build_index(vectors: np.ndarray, index_factory: str) -> faiss.Index:
+    """
+    Build and fill a FAISS index from an index-factory string (e.g. 'HNSW32', 'IVF256,PQ32', 'SQ8').
+
+    Indexes that need training (IVF, PQ, SQ) are trained on a random sample of `vectors`.
+
+    Parameters:
+        vectors (np.ndarray): float32 matrix of embeddings, in docstore order.
+        index_factory (str): FAISS index-factory string.
+
+    Returns:
+        faiss.Index: the populated index.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], index_factory)
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > MAX_TRAINING_VECTORS:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    return index
+
+
+def apply_search_params(index: faiss.Index, search_params: str):
+    """
+    Set query-time parameters such as 'efSearch=64' or 'nprobe=16' on a loaded index.
+    """
+    if search_params:
+        faiss.ParameterSpace().set_index_parameters(index, search_params)
+
+
+def docstore_vectors(vector_store, embeddings) -> np.ndarray:
+    """
+    Vectors of every document in a LangChain FAISS store, in index order.
+
+    `embeddings` is expected to be the cached embedding store, so nothing is re-encoded.
+    """
+    texts = [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[i]).page_content
+        for i in range(len(vector_store.index_to_docstore_id))
+    ]
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def rebuild_index(vector_store, embeddings, index_factory: str):
+    """
+    Replace the index of a LangChain FAISS store with one built from `index_factory`.
+
+    Used to turn the flat index LangChain builds into an ANN index before publishing, and to
+    turn a loaded ANN index (which may not support removal) back into a flat one for updates.
+    """
+    vector_store.index = build_index(docstore_vectors(vector_store, embeddings), index_factory)
+
+
+def save_search_params(index_dir: str, index_factory: str, search_params: str):
+    with open(os.path.join(index_dir, SEARCH_PARAMS_FILE), "w") as f:
+        json.dump({"index_factory": index_factory, "search_params": search_params}, f)
+
+
+def load_search_params(index_dir: str) -> Optional[Dict[str, str]]:
+    path = os.path.join(index_dir, SEARCH_PARAMS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def resolve_index_factory(
+    index_factory: Optional[str] = None, search_params: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Index-factory string and search parameters from the arguments, else FAISS_INDEX_FACTORY
+    and FAISS_SEARCH_PARAMS, else a flat index.
+    """
+    index_factory = index_factory or os.getenv("FAISS_INDEX_FACTORY", DEFAULT_INDEX_FACTORY)
+    if search_params is None:
+        search_params = os.getenv("FAISS_SEARCH_PARAMS") or default_search_params(index_factory)
+    return {"index_factory": index_factory, "search_params": search_params}
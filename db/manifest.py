@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Callable, Dict, List, Optional
+
+from .docstore import save_vector_store
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hash a source file in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def texts_sha256(texts: List[str]) -> str:
+    """
+    Hash a list of texts, for derived sources such as RAPTOR summaries that have no file.
+    """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def chunk_ids(source: str, source_hash: str, n_chunks: int) -> List[str]:
+    """
+    Deterministic vector IDs for the chunks of one version of a source.
+    """
+    prefix = hashlib.sha256(f"{source}\0{source_hash}".encode("utf-8")).hexdigest()[:16]
+    return [f"{prefix}:{i}" for i in range(n_chunks)]
+
+
+class IndexManifest:
+    """
+    Record of the sources ingested into a FAISS index: content hash and chunk IDs per source.
+
+    Stored as `manifest.json` inside each published index version.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, Dict]] = None, version: int = 0):
+        self.sources = sources or {}
+        self.version = version
+
+    @classmethod
+    def load(cls, index_dir: str) -> "IndexManifest":
+        path = os.path.join(index_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("sources"), data.get("version", 0))
+
+    def save(self, index_dir: str):
+        with open(os.path.join(index_dir, MANIFEST_FILE), "w") as f:
+            json.dump({"version": self.version, "sources": self.sources}, f, indent=2)
+
+    def source_hash(self, source: str) -> Optional[str]:
+        entry = self.sources.get(source)
+        return entry["sha256"] if entry else None
+
+    def chunk_ids(self, source: str) -> List[str]:
+        entry = self.sources.get(source)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def set_source(self, source: str, source_hash: str, ids: List[str]):
+        self.sources[source] = {"sha256": source_hash, "chunk_ids": ids}
+
+    def remove_source(self, source: str):
+        self.sources.pop(source, None)
+
+
+def resolve_index_dir(db_path: str) -> str:
+    """
+    Directory holding the live index files.
+
+    Published indexes live in versioned subdirectories named by the `CURRENT` pointer file;
+    indexes saved before versioning sit directly in `db_path`.
+    """
+    current = os.path.join(db_path, CURRENT_FILE)
+    if os.path.exists(current):
+        with open(current) as f:
+            return os.path.join(db_path, f.read().strip())
+    return db_path
+
+
+def index_version(db_path: str) -> str:
+    """
+    Identifier of the live index that changes whenever a new index is published.
+    """
+    index_dir = resolve_index_dir(db_path)
+    if index_dir != db_path:
+        return os.path.basename(index_dir)
+    legacy_index = os.path.join(db_path, "index.faiss")
+    return f"legacy-{int(os.path.getmtime(legacy_index))}" if os.path.exists(legacy_index) else ""
+
+
+def publish_index(
+    vector_store,
+    manifest: IndexManifest,
+    db_path: str,
+    write_extra: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    Atomically publish a new version of the index under `db_path`.
+
+    The index is written to a temporary directory, renamed to its version directory and only
+    then made live by atomically replacing the `CURRENT` pointer, so a process loading the
+    index never sees a half-written version. The previous version is kept for readers that
+    resolved it just before the switch; older ones are removed.
+
+    `write_extra`, if given, is called with the temporary directory to add side files
+    (search parameters, auxiliary indexes) that must go live together with the index.
+
+    Returns:
+        str: Directory of the published version.
+    """
+    os.makedirs(db_path, exist_ok=True)
+    existing = [
+        int(entry[1:7]) for entry in os.listdir(db_path) if entry.startswith("v") and entry[1:7].isdigit()
+    ]
+    manifest.version = max([manifest.version, *existing]) + 1
+    name = f"v{manifest.version:06d}"
+    final_dir = os.path.join(db_path, name)
+    tmp_dir = final_dir + ".tmp"
+    for stale in (tmp_dir, final_dir):
+        if os.path.exists(stale):
+            shutil.rmtree(stale)
+
+    save_vector_store(vector_store, tmp_dir)
+    manifest.save(tmp_dir)
+    if write_extra:
+        write_extra(tmp_dir)
+    os.replace(tmp_dir, final_dir)
+
+    previous = resolve_index_dir(db_path)
+    pointer_tmp = os.path.join(db_path, CURRENT_FILE + ".tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(db_path, CURRENT_FILE))
+
+    keep = {name, os.path.basename(previous)}
+    for entry in os.listdir(db_path):
+        path = os.path.join(db_path, entry)
+        if entry.startswith("v") and entry not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return final_dir
@@ -0,0 +1,125 @@
+import json
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+TREE_FILE = "tree.json"
+
+
+def raptor_summary_metadata(results: Dict, leaf_ids: List[str], summary_ids: List[str]) -> List[Dict]:
+    """
+    Tree metadata for the summaries of every RAPTOR level.
+
+    Parameters:
+        results (Dict): output of `recursive_embed_cluster_summarize`; the rows of each level's
+            `df_clusters` are the nodes one level below, in order.
+        leaf_ids (List[str]): IDs of the leaf chunks, in the order they were clustered.
+        summary_ids (List[str]): IDs of all summaries, level by level in `df_summary` order.
+
+    Returns:
+        List[Dict]: one metadata dict per summary with its id, level, cluster and child_ids.
+    """
+    metadatas = []
+    level_ids = {0: list(leaf_ids)}
+    offset = 0
+    for level in sorted(results):
+        df_clusters, df_summary = results[level]
+        children_of_level = level_ids[level - 1]
+        members = {}
+        for row, clusters in enumerate(df_clusters["cluster"]):
+            for cluster in clusters:
+                members.setdefault(int(cluster), []).append(children_of_level[row])
+
+        ids = summary_ids[offset:offset + len(df_summary)]
+        offset += len(df_summary)
+        for node_id, cluster in zip(ids, df_summary["cluster"]):
+            metadatas.append(
+                {
+                    "id": node_id,
+                    "level": level,
+                    "cluster": int(cluster),
+                    "child_ids": members.get(int(cluster), []),
+                }
+            )
+        level_ids[level] = ids
+    return metadatas
+
+
+class RaptorTree:
+    """
+    Parent/child structure of a RAPTOR index in FAISS positions.
+
+    Args:
+        roots (List[int]): positions of nodes that are nobody's child (top summaries, orphans).
+        children (Dict[int, List[int]]): child positions per summary position.
+    """
+
+    def __init__(self, roots: List[int], children: Dict[int, List[int]]):
+        self.roots = roots
+        self.children = children
+
+    @staticmethod
+    def write(vector_store, index_dir: str) -> bool:
+        """
+        Derive the tree from the `id`/`child_ids` document metadata and save it as `tree.json`.
+
+        Returns:
+            bool: False when the documents carry no tree metadata.
+        """
+        n_docs = len(vector_store.index_to_docstore_id)
+        metadatas = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i]).metadata
+            for i in range(n_docs)
+        ]
+        if not any(m.get("child_ids") for m in metadatas):
+            return False
+        positions = {m["id"]: i for i, m in enumerate(metadatas) if "id" in m}
+        children = {}
+        for i, metadata in enumerate(metadatas):
+            child_positions = [positions[c] for c in metadata.get("child_ids", []) if c in positions]
+            if child_positions:
+                children[i] = child_positions
+        is_child = {c for child_positions in children.values() for c in child_positions}
+        roots = [i for i in range(n_docs) if i not in is_child]
+        with open(os.path.join(index_dir, TREE_FILE), "w") as f:
+            json.dump({"roots": roots, "children": children}, f)
+        return True
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["RaptorTree"]:
+        path = os.path.join(index_dir, TREE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["roots"], {int(k): v for k, v in data["children"].items()})
+
+    def traverse(
+        self,
+        query_vector: np.ndarray,
+        vectors_for: Callable[[List[int]], np.ndarray],
+        beam_width: int = 4,
+    ) -> List[int]:
+        """
+        Beam search from the roots down, scoring only the children of the best nodes.
+
+        Parameters:
+            query_vector (np.ndarray): query embedding.
+            vectors_for (Callable): returns the embeddings of a list of positions.
+            beam_width (int): nodes kept per step.
+
+        Returns:
+            List[int]: positions of the kept nodes at every step, summaries and leaves alike.
+        """
+        query = query_vector / (np.linalg.norm(query_vector) or 1.0)
+        kept: List[int] = []
+        frontier = list(self.roots)
+        while frontier:
+            vectors = vectors_for(frontier)
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            best = np.argsort(-(vectors @ query))[:beam_width]
+            top = [frontier[i] for i in best]
+            kept.extend(top)
+            frontier = list(dict.fromkeys(c for node in top for c in self.children.get(node, [])))
+        return kept
@@ -1,2 +1,13 @@
-from .clustering import recursive_embed_cluster_summarize
-from .langchain_utils import get_embeddings, get_llm, create_conversational_chain
+from .langchain_utils import get_embeddings, get_llm, get_chat_model, create_conversational_chain, register_provider
+from .provider_pool import ProviderPool
+from .streaming import StreamStats, stream_answer, astream_answer
+from .rewrite_policy import RewriteStats, needs_rewrite, rewrite_stats
+
+
+def __getattr__(name):
+    # Clustering pulls in umap, numba, sklearn and pandas; only index builds need it
+    if name == "recursive_embed_cluster_summarize":
+        from .clustering import recursive_embed_cluster_summarize
+
+        return recursive_embed_cluster_summarize
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,212 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .rewrite_policy import needs_rewrite
+
+PRUNE_INTERVAL = 300.0  # Seconds between deletions of expired and surplus rows from the SQLite file
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case and collapse whitespace and trailing punctuation for exact-match lookups."""
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip("?!. ")
+
+
+def answer_cache_policy(history_turns: int, question: str) -> Tuple[bool, bool]:
+    """
+    Whether a turn may be answered from the answer cache, and whether its answer may be stored.
+
+    First-turn and self-contained questions may be looked up. Only first-turn answers are
+    stored: later answers are generated with the chat history in the prompt and can repeat
+    what one user disclosed earlier to everyone asking a similar question.
+
+    Args:
+        history_turns (int): Turns in the conversation before this question.
+        question (str): The user's question.
+
+    Returns:
+        Tuple[bool, bool]: (may look up, may store).
+    """
+    first_turn = history_turns == 0
+    return first_turn or not needs_rewrite(question), first_turn
+
+
+class _Entry:
+    __slots__ = ("question", "vector", "answer", "created")
+
+    def __init__(self, question: str, vector: np.ndarray, answer: str, created: float):
+        self.question = question
+        self.vector = vector
+        self.answer = answer
+        self.created = created
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache for history-independent questions, matched by query-embedding similarity.
+
+    Identical questions (after normalization) are served without embedding the query at all;
+    near-duplicates are served when their cosine similarity to a cached question reaches
+    `threshold`. Entries expire after `ttl` seconds and the least recently used entry is
+    dropped beyond `maxsize`. With `path` set, entries are also written to a SQLite file
+    that other app processes pick up on their next miss, in insertion order. The file is held
+    to the same `ttl` and `maxsize` (oldest rows first) when opened and every PRUNE_INTERVAL
+    seconds. Entries belong to one index version and are discarded once the index is republished.
+
+    Args:
+        embeddings (Embeddings): Embedding model used for queries.
+        index_version (str): Version of the index the answers were generated from.
+        threshold (float): Minimum cosine similarity for a near-duplicate hit.
+        maxsize (int): Maximum number of in-memory entries.
+        ttl (float): Seconds an entry stays valid.
+        path (str): Optional SQLite file shared between processes.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index_version: str = "",
+        threshold: float = 0.95,
+        maxsize: int = 512,
+        ttl: float = 24 * 3600,
+        path: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.index_version = index_version
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._synced_id = 0
+        self._pruned_at = 0.0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Earlier files keyed rows by question only and cannot be synced by insertion order
+            self._conn.execute("DROP TABLE IF EXISTS answers")
+            # AUTOINCREMENT ids only grow, and a single SQLite writer commits them in order
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_cache (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "question TEXT UNIQUE NOT NULL, vector BLOB NOT NULL, answer TEXT NOT NULL, "
+                "index_version TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM answer_cache WHERE index_version != ?", (index_version,))
+            self._conn.commit()
+            self._prune(time.time())
+            self._sync()
+
+    @classmethod
+    def from_env(cls, embeddings: Embeddings, index_version: str = "") -> Optional["SemanticAnswerCache"]:
+        """
+        Build the cache from ANSWER_CACHE_* environment variables; ANSWER_CACHE=0 disables it.
+        """
+        if os.getenv("ANSWER_CACHE", "1") == "0":
+            return None
+        return cls(
+            embeddings,
+            index_version,
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+            maxsize=int(os.getenv("ANSWER_CACHE_MAXSIZE", "512")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+            path=os.getenv("ANSWER_CACHE_PATH") or None,
+        )
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _insert(self, entry: _Entry):
+        self._entries[entry.question] = entry
+        self._entries.move_to_end(entry.question)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _expire(self, now: float):
+        for key in [k for k, e in self._entries.items() if now - e.created > self.ttl]:
+            del self._entries[key]
+
+    def _prune(self, now: float):
+        """Delete expired rows and all but the newest `maxsize` rows from the SQLite file."""
+        self._conn.execute("DELETE FROM answer_cache WHERE created < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM answer_cache WHERE id NOT IN (SELECT id FROM answer_cache ORDER BY id DESC LIMIT ?)",
+            (self.maxsize,),
+        )
+        self._conn.commit()
+        self._pruned_at = now
+
+    def _sync(self):
+        """Pull unexpired entries written by other processes since the last sync."""
+        if self._conn is None:
+            return
+        rows = self._conn.execute(
+            "SELECT id, question, vector, answer, created FROM answer_cache "
+            "WHERE index_version = ? AND id > ? AND created >= ? ORDER BY id",
+            (self.index_version, self._synced_id, time.time() - self.ttl),
+        ).fetchall()
+        for row_id, question, vector, answer, created in rows:
+            self._insert(_Entry(question, np.frombuffer(vector, dtype=np.float32), answer, created))
+            self._synced_id = row_id
+
+    def _nearest(self, vector: np.ndarray) -> Optional[_Entry]:
+        if not self._entries:
+            return None
+        entries = list(self._entries.values())
+        similarities = np.stack([e.vector for e in entries]) @ vector
+        best = int(np.argmax(similarities))
+        return entries[best] if similarities[best] >= self.threshold else None
+
+    def lookup(self, question: str) -> Optional[str]:
+        """
+        Return a cached answer for `question`, or None on a miss.
+        """
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._sync()
+                entry = self._entries.get(key)
+        if entry is None:
+            vector = self._embed(question)
+            with self._lock:
+                entry = self._nearest(vector)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if entry.question in self._entries:
+                self._entries.move_to_end(entry.question)
+            return entry.answer
+
+    def store(self, question: str, answer: str):
+        """
+        Cache the answer generated for `question`.
+        """
+        key = normalize_question(question)
+        entry = _Entry(key, self._embed(question), answer, time.time())
+        with self._lock:
+            self._insert(entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answer_cache (question, vector, answer, index_version, created) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, entry.vector.tobytes(), answer, self.index_version, entry.created),
+                )
+                self._conn.commit()
+                if entry.created - self._pruned_at > PRUNE_INTERVAL:
+                    self._prune(entry.created)
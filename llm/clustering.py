@@ -3,16 +3,68 @@ import shutil
 import numpy as np
 import pandas as pd
 import umap
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from sklearn.mixture import GaussianMixture
 
-from .langchain_utils import get_embeddings, get_llm
+from .embedding_backends import embedding_cache_name
+from .embedding_store import CachedEmbeddings, get_cached_embeddings
+from .langchain_utils import get_embedding_model_name, get_embeddings, get_llm
+from .raptor_checkpoint import BuildProgress, RaptorCheckpoint, level_fingerprint
+from .summarization import SummarizationExecutor
+from .summary_cache import SummaryCache, model_identifier, summary_key
 
 RANDOM_SEED = 224  # Fixed seed for reproducibility
+MIN_ROWS_FOR_PARALLEL_BIC = 200  # Below this, process start-up costs more than the fits
+BUILD_EMBED_BATCH_SIZE = 256  # Texts per embedding call during builds, between progress reports
+
+SUMMARY_TEMPLATE = """These are documents related to different Mental Health problems.
+    
+    Give a detailed summary of the documentation provided.
+    
+    Documentation:
+    {context}
+    """
+
+
+class ClusterAssignments(NamedTuple):
+    """
+    Sparse cluster membership: row `rows[k]` of the embeddings belongs to cluster `clusters[k]`.
+
+    Pairs are ordered by cluster id, so the members of one cluster are contiguous.
+    """
+
+    rows: np.ndarray
+    clusters: np.ndarray
+    n_rows: int
+    n_clusters: int
+
+    def per_row(self) -> List[np.ndarray]:
+        """
+        Expand the assignments into one array of cluster IDs per embedding row.
+
+        Rows that fell below the probability threshold for every cluster get an empty array.
+        """
+        if self.n_rows == 0:
+            return []
+        order = np.argsort(self.rows, kind="stable")
+        counts = np.bincount(self.rows, minlength=self.n_rows)
+        return np.split(self.clusters[order], np.cumsum(counts)[:-1])
+
+
+def _labels_to_pairs(labels: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flatten per-row GMM labels into parallel (row index, cluster id) arrays.
+    """
+    if len(labels) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    rows = np.repeat(np.arange(len(labels)), [len(label) for label in labels])
+    clusters = np.concatenate(labels).astype(np.int64)
+    return rows, clusters
 
 
 def global_cluster_embeddings(
@@ -37,7 +89,7 @@ def global_cluster_embeddings(
     if n_neighbors is None:
         n_neighbors = int((len(embeddings) - 1) ** 0.5)
     return umap.UMAP(
-        n_neighbors=n_neighbors, n_components=dim, metric=metric
+        n_neighbors=n_neighbors, n_components=dim, metric=metric, random_state=RANDOM_SEED
     ).fit_transform(embeddings)
 
 
@@ -57,12 +109,88 @@ def local_cluster_embeddings(
     - A numpy array of the embeddings reduced to the specified dimensionality.
     """
     return umap.UMAP(
-        n_neighbors=num_neighbors, n_components=dim, metric=metric
+        n_neighbors=num_neighbors, n_components=dim, metric=metric, random_state=RANDOM_SEED
     ).fit_transform(embeddings)
 
 
+def _gmm_bic(embeddings: np.ndarray, n: int, random_state: int) -> float:
+    """
+    Fit a Gaussian Mixture Model with `n` components and return its BIC.
+    """
+    gm = GaussianMixture(n_components=n, random_state=random_state)
+    gm.fit(embeddings)
+    return gm.bic(embeddings)
+
+
+_bic_pool: Optional[ProcessPoolExecutor] = None
+_bic_pool_workers = 0
+
+
+def _get_bic_pool(n_jobs: int) -> ProcessPoolExecutor:
+    """
+    Process pool shared by all model selection calls, so workers are started once per build.
+    """
+    global _bic_pool, _bic_pool_workers
+    if _bic_pool is None or _bic_pool_workers != n_jobs:
+        if _bic_pool is not None:
+            _bic_pool.shutdown()
+        _bic_pool = ProcessPoolExecutor(max_workers=n_jobs)
+        _bic_pool_workers = n_jobs
+    return _bic_pool
+
+
+def _fast_optimal_clusters(
+    embeddings: np.ndarray,
+    candidates: np.ndarray,
+    random_state: int,
+    n_jobs: int,
+    patience: int,
+) -> int:
+    """
+    Coarse-to-fine BIC search with early stopping.
+
+    A coarse grid over `candidates` is fitted in batches of `n_jobs` in increasing order and
+    abandoned once `patience` consecutive grid points have all been worse than the best BIC.
+    The neighbourhood of the best coarse point is then searched exhaustively.
+    """
+    bics: Dict[int, float] = {}
+    use_pool = n_jobs > 1 and len(embeddings) >= MIN_ROWS_FOR_PARALLEL_BIC
+    pool = _get_bic_pool(n_jobs) if use_pool else None
+
+    def evaluate(ns):
+        ns = [int(n) for n in ns if int(n) not in bics]
+        if pool is None:
+            results = [_gmm_bic(embeddings, n, random_state) for n in ns]
+        else:
+            results = pool.map(_gmm_bic, [embeddings] * len(ns), ns, [random_state] * len(ns))
+        bics.update(zip(ns, results))
+
+    step = max(1, int(np.sqrt(len(candidates))))
+    coarse = candidates[::step]
+    batch_size = max(1, n_jobs)
+    worse_streak = 0
+    for start in range(0, len(coarse), batch_size):
+        batch = coarse[start:start + batch_size]
+        evaluate(batch)
+        best = min(bics.values())
+        for n in batch:
+            worse_streak = 0 if bics[int(n)] <= best else worse_streak + 1
+        if worse_streak >= patience:
+            break
+
+    best_n = min(bics, key=bics.get)
+    fine = candidates[(candidates > best_n - step) & (candidates < best_n + step)]
+    evaluate(fine)
+    return min(bics, key=bics.get)
+
+
 def get_optimal_clusters(
-    embeddings: np.ndarray, max_clusters: int = 50, random_state: int = RANDOM_SEED
+    embeddings: np.ndarray,
+    max_clusters: int = 50,
+    random_state: int = RANDOM_SEED,
+    search: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    patience: int = 3,
 ) -> int:
     """
     Determine the optimal number of clusters using the Bayesian Information Criterion (BIC) with a Gaussian Mixture Model.
@@ -71,17 +199,28 @@ def get_optimal_clusters(
     - embeddings: The input embeddings as a numpy array.
     - max_clusters: The maximum number of clusters to consider.
     - random_state: Seed for reproducibility.
+    - search: 'exhaustive' fits every candidate in turn; 'fast' runs a parallel coarse-to-fine search
+              with early stopping. Defaults to the CLUSTER_SEARCH environment variable, else 'exhaustive'.
+    - n_jobs: Worker processes for the fast search. Defaults to CLUSTER_SEARCH_JOBS or the CPU count.
+    - patience: Coarse grid points past the BIC minimum after which the fast search stops.
 
     Returns:
     - An integer representing the optimal number of clusters found.
     """
     max_clusters = min(max_clusters, len(embeddings))
     n_clusters = np.arange(1, max_clusters)
+    search = search or os.getenv("CLUSTER_SEARCH", "exhaustive")
+
+    if search == "fast":
+        if n_jobs is None:
+            n_jobs = int(os.getenv("CLUSTER_SEARCH_JOBS", "0")) or os.cpu_count() or 1
+        return _fast_optimal_clusters(embeddings, n_clusters, random_state, n_jobs, patience)
+    if search != "exhaustive":
+        raise ValueError(f"Unsupported cluster search: {search}")
+
     bics = []
     for n in n_clusters:
-        gm = GaussianMixture(n_components=n, random_state=random_state)
-        gm.fit(embeddings)
-        bics.append(gm.bic(embeddings))
+        bics.append(_gmm_bic(embeddings, n, random_state))
     return n_clusters[np.argmin(bics)]
 
 
@@ -105,26 +244,32 @@ def GMM_cluster(embeddings: np.ndarray, threshold: float, random_state: int = 0)
     return labels, n_clusters
 
 
-def perform_clustering(
+def cluster_assignments(
     embeddings: np.ndarray,
     dim: int,
     threshold: float,
-) -> List[np.ndarray]:
+) -> ClusterAssignments:
     """
     Perform clustering on the embeddings by first reducing their dimensionality globally, then clustering
     using a Gaussian Mixture Model, and finally performing local clustering within each global cluster.
 
+    Original row indices are carried through the global and local stages, so every local cluster maps
+    straight back to its rows without comparing embeddings, and identical embeddings stay distinct.
+
     Parameters:
     - embeddings: The input embeddings as a numpy array.
     - dim: The target dimensionality for UMAP reduction.
     - threshold: The probability threshold for assigning an embedding to a cluster in GMM.
 
     Returns:
-    - A list of numpy arrays, where each array contains the cluster IDs for each embedding.
+    - A ClusterAssignments holding the (row, cluster ID) pairs.
     """
-    if len(embeddings) <= dim + 1:
+    n_rows = len(embeddings)
+    if n_rows <= dim + 1:
         # Avoid clustering when there's insufficient data
-        return [np.array([0]) for _ in range(len(embeddings))]
+        return ClusterAssignments(
+            np.arange(n_rows), np.zeros(n_rows, dtype=np.int64), n_rows, 1 if n_rows else 0
+        )
 
     # Global dimensionality reduction
     reduced_embeddings_global = global_cluster_embeddings(embeddings, dim)
@@ -132,48 +277,67 @@ def perform_clustering(
     global_clusters, n_global_clusters = GMM_cluster(
         reduced_embeddings_global, threshold
     )
+    global_rows, global_ids = _labels_to_pairs(global_clusters)
 
-    all_local_clusters = [np.array([]) for _ in range(len(embeddings))]
+    all_rows = []
+    all_clusters = []
     total_clusters = 0
 
     # Iterate through each global cluster to perform local clustering
     for i in range(n_global_clusters):
-        # Extract embeddings belonging to the current global cluster
-        global_cluster_embeddings_ = embeddings[
-            np.array([i in gc for gc in global_clusters])
-        ]
+        # Original row indices of the embeddings belonging to the current global cluster
+        member_rows = global_rows[global_ids == i]
 
-        if len(global_cluster_embeddings_) == 0:
+        if len(member_rows) == 0:
             continue
-        if len(global_cluster_embeddings_) <= dim + 1:
+        if len(member_rows) <= dim + 1:
             # Handle small clusters with direct assignment
-            local_clusters = [np.array([0]) for _ in global_cluster_embeddings_]
+            local_rows = np.arange(len(member_rows))
+            local_ids = np.zeros(len(member_rows), dtype=np.int64)
             n_local_clusters = 1
         else:
             # Local dimensionality reduction and clustering
             reduced_embeddings_local = local_cluster_embeddings(
-                global_cluster_embeddings_, dim
+                embeddings[member_rows], dim
             )
             local_clusters, n_local_clusters = GMM_cluster(
                 reduced_embeddings_local, threshold
             )
+            local_rows, local_ids = _labels_to_pairs(local_clusters)
 
-        # Assign local cluster IDs, adjusting for total clusters already processed
-        for j in range(n_local_clusters):
-            local_cluster_embeddings_ = global_cluster_embeddings_[
-                np.array([j in lc for lc in local_clusters])
-            ]
-            indices = np.where(
-                (embeddings == local_cluster_embeddings_[:, None]).all(-1)
-            )[1]
-            for idx in indices:
-                all_local_clusters[idx] = np.append(
-                    all_local_clusters[idx], j + total_clusters
-                )
+        # Map local positions back to original rows, adjusting for total clusters already processed
+        order = np.argsort(local_ids, kind="stable")
+        all_rows.append(member_rows[local_rows[order]])
+        all_clusters.append(local_ids[order] + total_clusters)
 
         total_clusters += n_local_clusters
 
-    return all_local_clusters
+    if not all_rows:
+        return ClusterAssignments(
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), n_rows, 0
+        )
+    return ClusterAssignments(
+        np.concatenate(all_rows), np.concatenate(all_clusters), n_rows, total_clusters
+    )
+
+
+def perform_clustering(
+    embeddings: np.ndarray,
+    dim: int,
+    threshold: float,
+) -> List[np.ndarray]:
+    """
+    Cluster the embeddings with `cluster_assignments` and return the cluster IDs per embedding.
+
+    Parameters:
+    - embeddings: The input embeddings as a numpy array.
+    - dim: The target dimensionality for UMAP reduction.
+    - threshold: The probability threshold for assigning an embedding to a cluster in GMM.
+
+    Returns:
+    - A list of numpy arrays, where each array contains the cluster IDs for each embedding.
+    """
+    return cluster_assignments(embeddings, dim, threshold).per_row()
 
 
 def embed(texts, embeddings):
@@ -181,7 +345,8 @@ def embed(texts, embeddings):
     Generate embeddings for a list of text documents.
 
     This function assumes the existence of an `embeddings` object with a method `embed_documents`
-    that takes a list of texts and returns their embeddings.
+    that takes a list of texts and returns their embeddings. `CachedEmbeddings` are read straight
+    from the embedding store as a float32 matrix.
 
     Parameters:
     - texts (List[str]): list of text documents to be embedded.
@@ -189,12 +354,27 @@ def embed(texts, embeddings):
     Returns:
     - numpy.ndarray: An array of embeddings for the given text documents.
     """
+    if isinstance(embeddings, CachedEmbeddings):
+        return embeddings.embed_array(texts)
     text_embeddings = embeddings.embed_documents(texts)
     text_embeddings_np = np.array(text_embeddings)
     return text_embeddings_np
 
 
-def embed_cluster_texts(texts):
+def embed_with_progress(texts, embeddings, label: str):
+    """
+    `embed` in batches of BUILD_EMBED_BATCH_SIZE texts, reporting progress and ETA under `label`.
+    """
+    progress = BuildProgress(label, len(texts))
+    batches = []
+    for start in range(0, len(texts), BUILD_EMBED_BATCH_SIZE):
+        batch = texts[start:start + BUILD_EMBED_BATCH_SIZE]
+        batches.append(embed(batch, embeddings))
+        progress.update(len(batch))
+    return np.concatenate(batches) if batches else embed(texts, embeddings)
+
+
+def embed_cluster_texts(texts, level: int = 1, checkpoint: Optional[RaptorCheckpoint] = None):
     """
     Embeds a list of texts and clusters them, returning a DataFrame with texts, their embeddings, and cluster labels.
 
@@ -203,15 +383,30 @@ def embed_cluster_texts(texts):
 
     Parameters:
     - texts (List[str]): list of text documents to be processed.
+    - level (int): RAPTOR level of the texts, used for progress output and the checkpoint.
+    - checkpoint (RaptorCheckpoint): Optional; embeddings and clusters already stored there are reused,
+      and new ones are stored as soon as they are computed.
 
     Returns:
     - pandas.DataFrame: A DataFrame containing the original texts, their embeddings, and the assigned cluster labels.
     """
-    embeddings = get_embeddings()
-    text_embeddings_np = embed(texts, embeddings)  # Generate embeddings
-    cluster_labels = perform_clustering(
-        text_embeddings_np, 10, 0.1
-    )  # Perform clustering on the embeddings
+    text_embeddings_np = checkpoint.load_embeddings(level) if checkpoint is not None else None
+    if text_embeddings_np is None:
+        # Each batch also lands in the embedding store, so an interrupted stage resumes from there
+        embeddings = get_cached_embeddings(embedding_cache_name(get_embedding_model_name()), get_embeddings)
+        text_embeddings_np = embed_with_progress(texts, embeddings, f"Level {level} embeddings")
+        if checkpoint is not None:
+            checkpoint.save_embeddings(level, text_embeddings_np)
+
+    saved = checkpoint.load_clusters(level) if checkpoint is not None else None
+    if saved is not None:
+        assignments = ClusterAssignments(*saved)
+    else:
+        # Perform clustering on the embeddings
+        assignments = cluster_assignments(text_embeddings_np, 10, 0.1)
+        if checkpoint is not None:
+            checkpoint.save_clusters(level, *assignments)
+    cluster_labels = assignments.per_row()
     df = pd.DataFrame()  # Initialize a DataFrame to store the results
     df["text"] = texts  # Store original texts
     df["embd"] = list(text_embeddings_np)  # Store embeddings as a list in the DataFrame
@@ -235,7 +430,12 @@ def fmt_txt(df: pd.DataFrame) -> str:
 
 
 def embed_cluster_summarize_texts(
-    texts: List[str], level: int, model: str
+    texts: List[str],
+    level: int,
+    model: str,
+    executor: Optional[SummarizationExecutor] = None,
+    cache: Optional[SummaryCache] = None,
+    checkpoint: Optional[RaptorCheckpoint] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Embeds, clusters, and summarizes a list of texts. This function first generates embeddings for the texts,
@@ -245,6 +445,9 @@ def embed_cluster_summarize_texts(
     Parameters:
     - texts: A list of text documents to be processed.
     - level: An integer parameter that could define the depth or detail of processing.
+    - executor: Optional; runs the cluster summaries concurrently. Defaults to `SummarizationExecutor.from_env()`.
+    - cache: Optional; persistent summary cache consulted before calling the LLM.
+    - checkpoint: Optional; build checkpoint the level's stage outputs are restored from and saved to.
 
     Returns:
     - Tuple containing two DataFrames:
@@ -253,8 +456,17 @@ def embed_cluster_summarize_texts(
          and the cluster identifiers.
     """
 
+    finished = []
+    if checkpoint is not None:
+        fingerprint = level_fingerprint(
+            texts, embedding_cache_name(get_embedding_model_name()), model_identifier(model), SUMMARY_TEMPLATE
+        )
+        finished = checkpoint.start_level(level, fingerprint)
+        if finished:
+            print(f"--Level {level}: resuming after {', '.join(finished)}--")
+
     # Embed and cluster the texts, resulting in a DataFrame with 'text', 'embd', and 'cluster' columns
-    df_clusters = embed_cluster_texts(texts)
+    df_clusters = embed_cluster_texts(texts, level, checkpoint)
 
     # Prepare to expand the DataFrame for easier manipulation of clusters
     expanded_list = []
@@ -275,22 +487,39 @@ def embed_cluster_summarize_texts(
     print(f"--Generated {len(all_clusters)} clusters--")
 
     # Summarization
-    template = """These are documents related to different Mental Health problems.
-    
-    Give a detailed summary of the documentation provided.
-    
-    Documentation:
-    {context}
-    """
-    prompt = ChatPromptTemplate.from_template(template)
+    prompt = ChatPromptTemplate.from_template(SUMMARY_TEMPLATE)
     chain = prompt | model | StrOutputParser()
 
     # Format text within each cluster for summarization
-    summaries = []
-    for i in all_clusters:
-        df_cluster = expanded_df[expanded_df["cluster"] == i]
-        formatted_txt = fmt_txt(df_cluster)
-        summaries.append(chain.invoke({"context": formatted_txt}))
+    contexts = [fmt_txt(expanded_df[expanded_df["cluster"] == i]) for i in all_clusters]
+    if executor is None:
+        executor = SummarizationExecutor.from_env()
+
+    # Only clusters that are neither checkpointed nor cached with the same content, prompt and model go to the LLM
+    summaries = [None] * len(contexts)
+    if checkpoint is not None:
+        saved = checkpoint.load_summaries(level) or checkpoint.partial_summaries(level)
+        summaries = [saved.get(int(cluster)) for cluster in all_clusters]
+    keys = []
+    if cache is not None:
+        model_name = model_identifier(model)
+        keys = [summary_key(context, SUMMARY_TEMPLATE, model_name) for context in contexts]
+        summaries = [summary if summary is not None else cache.get(key) for summary, key in zip(summaries, keys)]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    progress = BuildProgress(f"Level {level} summaries", len(contexts), done=len(contexts) - len(missing))
+
+    def store(j: int, summary: str):
+        # Persist each summary as soon as it arrives so an interrupted build keeps its progress
+        if cache is not None:
+            cache.put(keys[missing[j]], summary)
+        if checkpoint is not None:
+            checkpoint.add_summary(level, int(all_clusters[missing[j]]), summary)
+        progress.update()
+
+    for i, summary in zip(missing, executor.map(chain, [contexts[i] for i in missing], store)):
+        summaries[i] = summary
+    if checkpoint is not None and "summaries" not in finished:
+        checkpoint.save_summaries(level, {int(cluster): s for cluster, s in zip(all_clusters, summaries)})
 
     # Create a DataFrame to store summaries with their corresponding cluster and level
     df_summary = pd.DataFrame(
@@ -305,7 +534,12 @@ def embed_cluster_summarize_texts(
 
 
 def recursive_embed_cluster_summarize(
-    texts: List[str], level: int = 1, n_levels: int = 3
+    texts: List[str],
+    level: int = 1,
+    n_levels: int = 3,
+    executor: Optional[SummarizationExecutor] = None,
+    cache: Optional[SummaryCache] = None,
+    checkpoint: Optional[RaptorCheckpoint] = None,
 ) -> Dict[int, Tuple[pd.DataFrame, pd.DataFrame]]:
     """
     Recursively embeds, clusters, and summarizes texts up to a specified level or until
@@ -315,6 +549,10 @@ def recursive_embed_cluster_summarize(
     - texts: List[str], texts to be processed.
     - level: int, current recursion level (starts at 1).
     - n_levels: int, maximum depth of recursion.
+    - executor: SummarizationExecutor, optional; shared by every level for cluster summaries.
+    - cache: SummaryCache, optional; defaults to `SummaryCache.from_env()` at the first level.
+    - checkpoint: RaptorCheckpoint, optional; every level's embeddings, clusters and summaries are saved
+      there as they finish, and a resumed build skips the stages it already holds.
 
     Returns:
     - Dict[int, Tuple[pd.DataFrame, pd.DataFrame]], a dictionary where keys are the recursion
@@ -323,8 +561,16 @@ def recursive_embed_cluster_summarize(
     results = {}  # Dictionary to store results at each level
 
     model = get_llm(provider = "openrouter")
+    if executor is None:
+        executor = SummarizationExecutor.from_env()
+    if cache is None and level == 1:
+        cache = SummaryCache.from_env()
     # Perform embedding, clustering, and summarization for the current level
-    df_clusters, df_summary = embed_cluster_summarize_texts(texts, level, model)
+    df_clusters, df_summary = embed_cluster_summarize_texts(
+        texts, level, model, executor, cache, checkpoint
+    )
+    if cache is not None:
+        print(f"--Summary cache after level {level}: {cache.stats()}--")
 
     # Store the results of the current level
     results[level] = (df_clusters, df_summary)
@@ -335,7 +581,7 @@ def recursive_embed_cluster_summarize(
         # Use summaries as the input texts for the next level of recursion
         new_texts = df_summary["summaries"].tolist()
         next_level_results = recursive_embed_cluster_summarize(
-            new_texts, level + 1, n_levels
+            new_texts, level + 1, n_levels, executor, cache, checkpoint
         )
 
         # Merge the results from the next level into the current results dictionary
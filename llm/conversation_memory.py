@@ -0,0 +1,168 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
+from .summarization import estimate_tokens
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+_summary_template = """Progressively summarize the conversation between a user and a mental health \
+support assistant. Extend the current summary with the new lines, keeping what the user shared \
+about their situation and feelings and the guidance already given. Reply with the new summary only.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+"""
+
+# One background worker folds old turns for every session, so summaries never compete with answers
+_fold_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-fold")
+
+Turn = Tuple[str, str]
+
+
+def create_summary_chain(language_model: BaseLanguageModel) -> Runnable:
+    """
+    Create the chain that folds old turns into the running conversation summary.
+
+    Args:
+        language_model: LLM used for summarizing.
+
+    Returns:
+        Runnable: Takes `summary` and `new_lines`, returns the updated summary string.
+    """
+    prompt = ChatPromptTemplate.from_template(_summary_template)
+    return prompt | language_model | StrOutputParser()
+
+
+class ConversationMemory:
+    """
+    Token-budgeted chat history: recent turns verbatim, older turns folded into a summary.
+
+    The last `keep_turns` turns are always kept as messages. Older turns are summarized in the
+    background by `summary_chain`; until a fold completes they are included verbatim only as far
+    as the budget allows. `messages()` never exceeds `token_budget` (estimated tokens), except
+    when the newest turn on its own is larger than the budget.
+
+    Args:
+        summary_chain (Runnable): Chain from `create_summary_chain`; without it, old turns are dropped.
+        token_budget (int): Maximum estimated tokens of history passed to the prompts.
+        keep_turns (int): Number of most recent turns kept verbatim.
+    """
+
+    def __init__(
+        self,
+        summary_chain: Optional[Runnable] = None,
+        token_budget: int = 1500,
+        keep_turns: int = 4,
+    ):
+        self.summary_chain = summary_chain
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary = ""
+        self._recent: List[Turn] = []
+        self._pending: List[Turn] = []
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, summary_chain: Optional[Runnable] = None) -> "ConversationMemory":
+        """Build a memory from MEMORY_TOKEN_BUDGET and MEMORY_KEEP_TURNS."""
+        return cls(
+            summary_chain,
+            token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "1500")),
+            keep_turns=int(os.getenv("MEMORY_KEEP_TURNS", "4")),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._recent) + len(self._pending) + (1 if self.summary else 0)
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self._recent = []
+            self._pending = []
+            self._future = None
+
+    def add_turn(self, question: str, answer: str):
+        """
+        Record a completed turn and schedule folding of turns that fell out of the window.
+        """
+        with self._lock:
+            self._recent.append((question, answer))
+            overflow = len(self._recent) - self.keep_turns
+            if overflow > 0:
+                self._pending.extend(self._recent[:overflow])
+                self._recent = self._recent[overflow:]
+            self._schedule_fold()
+
+    def _schedule_fold(self):
+        if not self._pending:
+            return
+        if self.summary_chain is None:
+            self._pending = []
+            return
+        if self._future is not None and not self._future.done():
+            return
+        batch = list(self._pending)
+        self._future = _fold_executor.submit(self._fold, batch, self.summary)
+
+    def _fold(self, batch: List[Turn], summary: str):
+        new_lines = "\n".join(f"User: {q}\nAssistant: {a}" for q, a in batch)
+        try:
+            updated = self.summary_chain.invoke({"summary": summary or "(none)", "new_lines": new_lines})
+        except Exception:
+            # Keep the turns pending; the next turn retries the fold
+            with self._lock:
+                self._future = None
+            return
+        with self._lock:
+            if self._pending[: len(batch)] != batch:
+                # Memory was cleared while folding
+                return
+            self.summary = updated.strip()
+            self._pending = self._pending[len(batch):]
+            self._future = None
+            self._schedule_fold()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until any in-flight fold finishes (for tests and scripts)."""
+        future = self._future
+        if future is not None:
+            future.result(timeout)
+
+    def messages(self) -> List[BaseMessage]:
+        """
+        Chat history for the prompts, bounded by the token budget.
+        """
+        with self._lock:
+            summary = self.summary
+            turns = self._pending + self._recent
+
+        budget = self.token_budget
+        history: List[BaseMessage] = []
+        if summary:
+            summary_message = SystemMessage(content=SUMMARY_PREFIX + summary)
+            budget -= estimate_tokens(summary_message.content)
+
+        # Walk back from the newest turn while the budget lasts
+        for i, (question, answer) in enumerate(reversed(turns)):
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if cost > budget and i > 0:
+                break
+            budget -= cost
+            history[:0] = [HumanMessage(content=question), AIMessage(content=answer)]
+
+        if summary:
+            history.insert(0, summary_message)
+        return history
@@ -0,0 +1,183 @@
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def get_embedding_backend() -> str:
+    """Embedding backend from EMBEDDING_BACKEND: 'torch' (default), 'onnx' or 'onnx-int8'."""
+    backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"EMBEDDING_BACKEND must be one of {EMBEDDING_BACKENDS}, got {backend!r}")
+    return backend
+
+
+def embedding_cache_name(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Namespace for cached vectors of a model, so vectors of different backends never mix.
+    """
+    backend = backend or get_embedding_backend()
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def export_onnx(model_name: str, cache_dir: str) -> str:
+    """
+    Fetch or export the ONNX graph and tokenizer of a HuggingFace model into `cache_dir`.
+
+    The ONNX graph published in the model repository (as for bge-small) is downloaded as is,
+    which needs neither torch nor Optimum. Models without one are exported with Optimum,
+    which needs torch once on the exporting machine.
+
+    Returns:
+        str: Directory holding `tokenizer.json` and `onnx/model.onnx`.
+    """
+    from huggingface_hub import hf_hub_download
+    from huggingface_hub.utils import EntryNotFoundError
+
+    model_dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+    onnx_path = os.path.join(model_dir, "onnx", "model.onnx")
+    if os.path.exists(onnx_path) and os.path.exists(os.path.join(model_dir, "tokenizer.json")):
+        return model_dir
+
+    hf_hub_download(model_name, "tokenizer.json", local_dir=model_dir)
+    try:
+        hf_hub_download(model_name, "1_Pooling/config.json", local_dir=model_dir)
+    except EntryNotFoundError:
+        pass
+    try:
+        hf_hub_download(model_name, "onnx/model.onnx", local_dir=model_dir)
+    except EntryNotFoundError:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(
+            os.path.dirname(onnx_path)
+        )
+    return model_dir
+
+
+def quantize_onnx(onnx_path: str) -> str:
+    """
+    Dynamically quantize the weights of an ONNX graph to int8, once.
+
+    Returns:
+        str: Path of the quantized graph next to the original.
+    """
+    quantized_path = onnx_path.replace(".onnx", "_int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp_path = quantized_path + ".tmp"
+        quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, quantized_path)
+    return quantized_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings computed with ONNX Runtime on CPU, without torch.
+
+    Produces the same vectors as `HuggingFaceEmbeddings` for models pooled by CLS token or
+    mean with normalization (bge-small uses CLS), up to numerical drift, which grows a little
+    with int8 quantization; see `benchmarks/embedding_backends.py`.
+
+    Args:
+        model_name (str): HuggingFace model name.
+        quantize (bool): Run the dynamically int8-quantized graph.
+        cache_dir (str): Where exported graphs are kept; defaults to ONNX_CACHE_DIR or .cache/onnx.
+        batch_size (int): Texts per forward pass.
+        max_length (int): Tokens per text; longer texts are truncated.
+        threads (int): ONNX Runtime intra-op threads; defaults to ONNX Runtime's choice.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = False,
+        cache_dir: Optional[str] = None,
+        batch_size: int = 32,
+        max_length: int = 512,
+        threads: Optional[int] = None,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        model_dir = export_onnx(model_name, cache_dir or os.getenv("ONNX_CACHE_DIR", ".cache/onnx"))
+        onnx_path = os.path.join(model_dir, "onnx", "model.onnx")
+        if quantize:
+            onnx_path = quantize_onnx(onnx_path)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        outputs = [o.name for o in self._session.get_outputs()]
+        self._output_name = "last_hidden_state" if "last_hidden_state" in outputs else outputs[0]
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length)
+        self._tokenizer.enable_padding()
+        self._cls_pooling = _uses_cls_pooling(model_dir)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` as a float32 matrix of unit vectors."""
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + self.batch_size])
+            mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": mask,
+            }
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            hidden = self._session.run([self._output_name], feeds)[0]
+            if self._cls_pooling:
+                pooled = hidden[:, 0]
+            else:
+                pooled = (hidden * mask[:, :, None]).sum(axis=1) / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+            batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+def _uses_cls_pooling(model_dir: str) -> bool:
+    path = os.path.join(model_dir, "1_Pooling", "config.json")
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        return bool(json.load(f).get("pooling_mode_cls_token"))
+
+
+def create_embeddings(model_name: str, backend: Optional[str] = None) -> Embeddings:
+    """
+    Create the CPU embedding model for the configured backend.
+
+    Parameters:
+        model_name (str): HuggingFace model name.
+        backend (str): 'torch' (sentence-transformers), 'onnx' or 'onnx-int8'; defaults to EMBEDDING_BACKEND.
+
+    Returns:
+        Embeddings: LangChain embeddings instance.
+    """
+    backend = backend or get_embedding_backend()
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": "cpu"})
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddings(model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unsupported embedding backend: {backend}")
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that batches concurrent `embed_query` calls into one forward pass.
+
+    A single worker thread takes the first waiting query, gathers further queries for up to
+    `max_wait_ms` or until `max_batch_size` are queued, and embeds them together with the
+    wrapped model's `embed_documents`. Sessions therefore share batched forward passes instead
+    of competing for CPU threads with one-sentence passes. This assumes queries and documents
+    are encoded the same way, as with the bge-small model used here.
+    `embed_documents` is passed straight through.
+
+    Args:
+        embeddings (Embeddings): Model to wrap.
+        max_batch_size (int): Maximum queries per forward pass.
+        max_wait_ms (float): How long the first query of a batch waits for company.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.queries = 0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, embeddings: Embeddings) -> Embeddings:
+        """
+        Wrap `embeddings` per EMBED_BATCH_SIZE and EMBED_BATCH_WAIT_MS; EMBED_BATCHING=0 returns it unwrapped.
+        """
+        if os.getenv("EMBED_BATCHING", "1") == "0":
+            return embeddings
+        return cls(
+            embeddings,
+            max_batch_size=int(os.getenv("EMBED_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "5")),
+        )
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.queries / self.batches if self.batches else 0.0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def submit(self, text: str) -> Future:
+        """Queue a query for the next batch."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
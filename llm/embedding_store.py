@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def text_key(text: str) -> str:
+    """Content hash identifying a text in the embedding store."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk embedding matrix for one embedding model.
+
+    Vectors live in a raw float32 file that is memory-mapped for reads, with the content
+    hash of each row kept in a parallel keys file. Vectors are written before their keys,
+    so a build interrupted mid-write never exposes a row without its vector.
+
+    Args:
+        directory (str): Root directory shared by all models.
+        model_name (str): Embedding model the vectors belong to.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        self.model_name = model_name
+        self.path = os.path.join(directory, model_name.replace("/", "__"))
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._keys_path = os.path.join(self.path, "keys.txt")
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+
+        self.dim: Optional[int] = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.dim = json.load(f)["dim"]
+
+        self._rows: Dict[str, int] = {}
+        if self.dim and os.path.exists(self._keys_path) and os.path.exists(self._vectors_path):
+            vectors_size = os.path.getsize(self._vectors_path)
+            n_vectors = vectors_size // (4 * self.dim)
+            n_keys = 0
+            with open(self._keys_path) as f:
+                for row, key in enumerate(f):
+                    n_keys += 1
+                    if row < n_vectors:
+                        self._rows[key.strip()] = row
+            if n_keys != len(self._rows) or vectors_size != len(self._rows) * 4 * self.dim:
+                self._truncate(len(self._rows))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _truncate(self, n_rows: int):
+        """Drop any partially written tail left behind by an interrupted write."""
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(n_rows * 4 * self.dim)
+        with open(self._keys_path, "w") as f:
+            f.writelines(f"{key}\n" for key in sorted(self._rows, key=self._rows.get))
+
+    def _matrix_view(self) -> np.ndarray:
+        if self._matrix is None or len(self._matrix) != len(self._rows):
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(len(self._rows), self.dim)
+            )
+        return self._matrix
+
+    def lookup(self, keys: List[str]) -> np.ndarray:
+        """
+        Row index of every key, or -1 for keys that are not stored yet.
+        """
+        with self._lock:
+            return np.array([self._rows.get(key, -1) for key in keys], dtype=np.int64)
+
+    def get(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Copy the vectors at `rows` out of the memory-mapped matrix.
+        """
+        with self._lock:
+            if len(rows) == 0:
+                return np.empty((0, self.dim or 0), dtype=np.float32)
+            return np.asarray(self._matrix_view()[rows])
+
+    def add(self, keys: List[str], vectors: np.ndarray):
+        """
+        Append new vectors; keys that are already stored are skipped.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+            fresh = [i for i, key in enumerate(keys) if key not in self._rows]
+            if not fresh:
+                return
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[fresh].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_path, "a") as f:
+                for i in fresh:
+                    f.write(f"{keys[i]}\n")
+                    self._rows[keys[i]] = len(self._rows)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` that encode each unique text at most once per model.
+
+    Document embeddings are served from an `EmbeddingStore`; only texts missing from the
+    store are sent to the underlying model, which is created lazily so a fully cached build
+    never loads it. Query embeddings always go to the underlying model.
+
+    Args:
+        model_name (str): Name of the embedding model, used as the store namespace.
+        factory (Callable[[], Embeddings]): Creates the underlying embedding model.
+        store (EmbeddingStore): Store holding previously computed vectors.
+    """
+
+    def __init__(self, model_name: str, factory: Callable[[], Embeddings], store: EmbeddingStore):
+        self.model_name = model_name
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._factory = factory
+        self._embeddings: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self._factory()
+            return self._embeddings
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed `texts` as a float32 matrix, encoding only texts not seen before.
+        """
+        keys = [text_key(text) for text in texts]
+        rows = self.store.lookup(keys)
+
+        missing = {}
+        for i in np.flatnonzero(rows < 0):
+            missing.setdefault(keys[i], texts[i])
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = np.asarray(self.embeddings.embed_documents(list(missing.values())), dtype=np.float32)
+            self.store.add(list(missing), vectors)
+            rows = self.store.lookup(keys)
+
+        return self.store.get(rows)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+_cached_embeddings: Dict[str, CachedEmbeddings] = {}
+_cached_embeddings_lock = threading.Lock()
+
+
+def get_cached_embeddings(model_name: str, factory: Callable[[], Embeddings]) -> CachedEmbeddings:
+    """
+    Process-wide `CachedEmbeddings` for `model_name`, stored under EMBEDDING_CACHE_DIR.
+
+    Args:
+        model_name (str): Name of the embedding model.
+        factory (Callable[[], Embeddings]): Creates the underlying embedding model on first miss.
+
+    Returns:
+        CachedEmbeddings: Shared instance for the model.
+    """
+    with _cached_embeddings_lock:
+        if model_name not in _cached_embeddings:
+            directory = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+            _cached_embeddings[model_name] = CachedEmbeddings(
+                model_name, factory, EmbeddingStore(directory, model_name)
+            )
+        return _cached_embeddings[model_name]
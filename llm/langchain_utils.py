@@ -1,25 +1,40 @@
 import os
-import streamlit as st
-
-from langchain_openai import AzureChatOpenAI
-from langchain_groq import ChatGroq
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from typing import Callable, Dict, Tuple
 
+import streamlit as st
 
-from langchain_community.vectorstores import FAISS
-
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains import create_retrieval_chain
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.prompts import MessagesPlaceholder
+from langchain_core.retrievers import BaseRetriever
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
+from .embedding_backends import create_embeddings
+from .provider_pool import ProviderPool
+from .rewrite_policy import create_rewrite_policy_retriever
+from .tracing import get_request_tracer
+
+
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+def get_embedding_model_name() -> str:
+    """
+    Name of the HuggingFace embedding model, from EMBEDDING_MODEL_NAME or the bge-small default.
+    """
+    return (
+        os.getenv("EMBEDDING_MODEL_NAME")
+        or st.secrets.get("EMBEDDING_MODEL_NAME")
+        or DEFAULT_EMBEDDING_MODEL
+    )
+
 
 def get_embeddings(provider: str = "huggingface"):
     """
     Retrieve embeddings model based on the specified provider.
     Tries to get config from environment variables first, then falls back to st.secrets.
+    The HuggingFace model runs on the EMBEDDING_BACKEND backend: 'torch', 'onnx' or 'onnx-int8'.
 
     Args:
         provider (str): The provider for the embeddings. Defaults to 'huggingface'.
@@ -29,12 +44,10 @@ def get_embeddings(provider: str = "huggingface"):
     """
     if provider.lower() == "huggingface":
         try:
-            model_name = os.getenv("EMBEDDING_MODEL_NAME") or st.secrets.get("EMBEDDING_MODEL_NAME")
-            embeddings = HuggingFaceEmbeddings(
-                model_name=model_name, model_kwargs={"device": "cpu"}
-            )
+            model_name = get_embedding_model_name()
+            embeddings = create_embeddings(model_name)
         except Exception as e:
-            st.error(f"Gemini initialization error: {e}")
+            st.error(f"Embeddings initialization error: {e}")
             raise
     else:
         raise ValueError(f"Unsupported provider for embeddings: {provider}")
@@ -42,81 +55,135 @@ def get_embeddings(provider: str = "huggingface"):
     return embeddings
 
 
+def get_config(key):
+    """Helper to get config from env vars or st.secrets"""
+    return os.getenv(key) or st.secrets.get(key)
+
+
+# Chat model providers by name; each factory imports its client SDK only when first called
+_PROVIDERS: Dict[str, Tuple[str, Callable[[], BaseChatModel]]] = {}
+
+
+def register_provider(name: str, label: str):
+    """
+    Register a chat model factory under `name` for `get_llm`.
+
+    Args:
+        name (str): Provider name passed to `get_llm`, matched case-insensitively.
+        label (str): Human-readable provider name used in error messages.
+    """
+
+    def decorator(factory: Callable[[], BaseChatModel]):
+        _PROVIDERS[name.lower()] = (label, factory)
+        return factory
+
+    return decorator
+
+
+@register_provider("azure", "Azure OpenAI")
+def _azure_chat_model():
+    from langchain_openai import AzureChatOpenAI
+
+    return AzureChatOpenAI(
+        openai_api_key=get_config("AZURE_OAI_KEY"),
+        azure_endpoint=get_config("AZURE_OPENAI_ENDPOINT"),
+        azure_deployment=get_config("AZURE_OPENAI_DEPLOYMENT"),
+        openai_api_version=get_config("AZURE_OPENAI_API_VERSION"),
+        openai_api_type="openai",
+    )
+
+
+@register_provider("groq", "Groq")
+def _groq_chat_model():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        groq_api_key=get_config("GROQ_API_KEY"),
+        model_name=get_config("GROQ_MODEL_NAME"),
+    )
+
+
+@register_provider("gemini", "Gemini")
+def _gemini_chat_model():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=get_config("GEMINI_MODEL_NAME"),
+        google_api_key=get_config("GEMINI_API_KEY")
+    )
+
+
+@register_provider("openrouter", "OpenRouter")
+def _openrouter_chat_model():
+    from langchain_openai import ChatOpenAI
+
+    # OpenRouter is OpenAI-compatible, just with a different base_url
+    return ChatOpenAI(
+        api_key=get_config("OPENROUTER_API_KEY"),
+        model=get_config("OPENROUTER_MODEL_NAME"),
+        base_url="https://openrouter.ai/api/v1",
+        # Optional: send extra parameters like reasoning
+        extra_body={"reasoning": {"enabled": True}},
+    )
+
+
 def get_llm(provider: str = "gemini"):
     """
     Retrieve an LLM model based on the specified provider.
     Tries to get config from environment variables first, then falls back to st.secrets.
 
+    Providers are registered with `register_provider`; a provider's client package is
+    imported the first time the provider is used.
+
     Args:
         provider (str): The provider for the LLM. Defaults to 'gemini'.
 
     Returns:
         LLM model instance.
     """
-    
-    def get_config(key):
-        """Helper to get config from env vars or st.secrets"""
-        return os.getenv(key) or st.secrets.get(key)
-
-    if provider.lower() == "azure":
-        try:
-            model = AzureChatOpenAI(
-                openai_api_key=get_config("AZURE_OAI_KEY"),
-                azure_endpoint=get_config("AZURE_OPENAI_ENDPOINT"),
-                azure_deployment=get_config("AZURE_OPENAI_DEPLOYMENT"),
-                openai_api_version=get_config("AZURE_OPENAI_API_VERSION"),
-                openai_api_type="openai",
-            )
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Azure OpenAI model: {e}")
+    entry = _PROVIDERS.get(provider.lower())
+    if entry is None:
+        raise ValueError(f"Unsupported provider: {provider}")
 
-    elif provider.lower() == "groq":
-        try:
-            model = ChatGroq(
-                groq_api_key=get_config("GROQ_API_KEY"),
-                model_name=get_config("GROQ_MODEL_NAME"),
-            )
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Groq model: {e}")
-    
-    elif provider.lower() == "gemini":
-        try:
-            model = ChatGoogleGenerativeAI(
-                model=get_config("GEMINI_MODEL_NAME"),
-                google_api_key=get_config("GEMINI_API_KEY")
-            )
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Gemini model: {e}")
-        
-    elif provider.lower() == "openrouter":
-        try:
-            # OpenRouter is OpenAI-compatible, just with a different base_url
-            model = ChatOpenAI(
-                api_key=get_config("OPENROUTER_API_KEY"),
-                model=get_config("OPENROUTER_MODEL_NAME"),
-                base_url="https://openrouter.ai/api/v1",
-                # Optional: send extra parameters like reasoning
-                extra_body={"reasoning": {"enabled": True}},
-            )
-        except Exception as e:
-            raise ValueError(f"Failed to initialize OpenRouter model: {e}")
+    label, factory = entry
+    try:
+        model = factory()
+    except Exception as e:
+        raise ValueError(f"Failed to initialize {label} model: {e}")
 
-    else:
-        raise ValueError(f"Unsupported provider: {provider}")
-    
     return model
 
-def create_conversational_chain(retriever: FAISS):
+def get_chat_model():
+    """
+    Chat model for answering: the provider named in LLM_PROVIDERS, or a `ProviderPool` that
+    hedges and fails over across several comma-separated providers, in order of preference.
+    Defaults to 'gemini'.
+
+    Returns:
+        Chat model instance.
+    """
+    names = [name.strip() for name in (get_config("LLM_PROVIDERS") or "gemini").split(",") if name.strip()]
+    if len(names) == 1:
+        return get_llm(provider=names[0])
+    return ProviderPool.from_env({name: get_llm(provider=name) for name in names})
+
+def create_conversational_chain(retriever: BaseRetriever, rewrite_mode: str = None):
     """
     Create the conversational retrieval chain.
 
+    Follow-up questions are only reformulated by the LLM when they need it; see
+    `create_rewrite_policy_retriever`. The chat model comes from `get_chat_model`. Each
+    request is timed per stage by the process-wide `RequestTracer` unless TRACING=0.
+
     Args:
-        retriever (FAISS): The vector database retriever.
+        retriever (BaseRetriever): The vector database retriever.
+        rewrite_mode (str): 'rewrite' or 'single_call'. Defaults to REWRITE_MODE, else 'rewrite'.
 
     Returns:
         create_retrieval_chain: The conversational retrieval chain.
     """
-    language_model = get_llm(provider="gemini")
+    language_model = get_chat_model()
+    rewrite_mode = rewrite_mode or os.getenv("REWRITE_MODE", "rewrite")
 
     contextualize_q_system_prompt = "Given a chat history and the latest user question \
     which might reference context in the chat history, formulate a standalone question \
@@ -131,8 +198,8 @@ def create_conversational_chain(retriever: FAISS):
         ]
     )
 
-    history_aware_retriever = create_history_aware_retriever(
-        language_model, retriever, contextualize_q_prompt
+    history_aware_retriever = create_rewrite_policy_retriever(
+        language_model, retriever, contextualize_q_prompt, mode=rewrite_mode
     )
 
     qa_system_prompt = """You are an assistant for question-answering tasks. \
@@ -142,6 +209,11 @@ def create_conversational_chain(retriever: FAISS):
     {context}.
     Do not include, "According to the context" in the final output
     """
+    if rewrite_mode == "single_call":
+        qa_system_prompt += """\
+    The latest question may refer to the chat history. Resolve such references \
+    from the chat history before answering.
+    """
 
     qa_prompt = ChatPromptTemplate.from_messages(
         [
@@ -156,4 +228,8 @@ def create_conversational_chain(retriever: FAISS):
         history_aware_retriever, question_answer_chain
     )
 
+    tracer = get_request_tracer()
+    if tracer is not None:
+        conversation_chain = conversation_chain.with_config(callbacks=[tracer])
+
     return conversation_chain
@@ -0,0 +1,392 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+    generate_from_stream,
+)
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig
+from pydantic import PrivateAttr
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latencies, in seconds."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """
+    Takes a provider out of rotation after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds the breaker is half-open: the provider is tried again, and the
+    next success closes the breaker while the next failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    @property
+    def available(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class _Race:
+    """Bookkeeping of one request's attempts: who is waiting, running and who won."""
+
+    def __init__(self, pool: "ProviderPool"):
+        self.pool = pool
+        self.waiting = pool._rotation()
+        self.running: Dict[str, float] = {}
+        self.hedged = False
+        self.winner: Optional[str] = None
+
+    def start_next(self) -> str:
+        name = self.waiting.pop(0)
+        self.running[name] = time.perf_counter()
+        return name
+
+    def hedge_timeout(self) -> Optional[float]:
+        """Seconds until a hedged attempt is due, or None when no hedge will be sent."""
+        if self.hedged or not self.waiting or len(self.running) != 1:
+            return None
+        (name, started), = self.running.items()
+        delay = self.pool.hedge_after(name)
+        if delay is None:
+            return None
+        return max(0.0, started + delay - time.perf_counter())
+
+    def hedge(self) -> str:
+        self.hedged = True
+        self.pool._count("hedges")
+        return self.start_next()
+
+    def fail(self, name: str, error: BaseException) -> bool:
+        """Record a failed attempt; True when the error ends the request."""
+        self.running.pop(name, None)
+        self.pool._record_failure(name)
+        if self.running:
+            return False
+        if not self.waiting:
+            return True
+        self.pool._count("failovers")
+        return False
+
+    def win(self, name: str) -> List[str]:
+        """Make `name` the winner and return the attempts to cancel."""
+        now = time.perf_counter()
+        self.winner = name
+        self.pool._record_success(name, now - self.running.pop(name))
+        losers = list(self.running)
+        for loser in losers:
+            # A lower bound of the loser's latency, so its percentiles still see the slow call
+            self.pool._record_latency(loser, now - self.running.pop(loser))
+        return losers
+
+
+class ProviderPool(BaseChatModel):
+    """
+    Chat model that spreads each request over several providers for tail latency and failover.
+
+    Every request goes to the first provider in rotation. If it has not produced its first token
+    after its rolling `hedge_percentile` latency (or `hedge_delay` until `min_samples` latencies
+    are known), a hedged request goes to the next provider; the first to produce a token
+    answers and the other is cancelled. A provider that fails is replaced by the next one, and
+    `failure_threshold` consecutive failures take it out of rotation for `reset_timeout` seconds.
+    Latencies are times to first token, since answers are streamed.
+
+    Streaming requests from a blocking caller run on threads; a cancelled attempt stops at its
+    next chunk. Async requests run as tasks, which are cancelled directly.
+
+    Attributes:
+        providers (Dict[str, BaseChatModel]): Chat models by name, in order of preference.
+        hedge_percentile (float): Percentile of the primary's latency after which to hedge; 0 disables hedging.
+        hedge_delay (float): Seconds before hedging while fewer than `min_samples` latencies are known.
+        min_samples (int): Latencies needed before the percentile is used.
+        window_size (int): Latencies kept per provider.
+        failure_threshold (int): Consecutive failures that open a provider's circuit breaker.
+        reset_timeout (float): Seconds a provider stays out of rotation.
+    """
+
+    providers: Dict[str, BaseChatModel]
+    hedge_percentile: float = 95.0
+    hedge_delay: float = 2.0
+    min_samples: int = 20
+    window_size: int = 200
+    failure_threshold: int = 3
+    reset_timeout: float = 30.0
+
+    _windows: Dict[str, LatencyWindow] = PrivateAttr()
+    _breakers: Dict[str, CircuitBreaker] = PrivateAttr()
+    _counters: Dict[str, int] = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._windows = {name: LatencyWindow(self.window_size) for name in self.providers}
+        self._breakers = {
+            name: CircuitBreaker(self.failure_threshold, self.reset_timeout) for name in self.providers
+        }
+        self._counters = {"requests": 0, "hedges": 0, "failovers": 0}
+        self._counters.update({f"wins:{name}": 0 for name in self.providers})
+
+    @classmethod
+    def from_env(cls, providers: Dict[str, BaseChatModel]) -> "ProviderPool":
+        """
+        Pool over `providers` configured by HEDGE_PERCENTILE, HEDGE_DELAY, BREAKER_FAILURES
+        and BREAKER_RESET_SECONDS.
+        """
+        return cls(
+            providers=providers,
+            hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+            hedge_delay=float(os.getenv("HEDGE_DELAY", "2")),
+            failure_threshold=int(os.getenv("BREAKER_FAILURES", "3")),
+            reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "provider-pool"
+
+    def hedge_after(self, name: str) -> Optional[float]:
+        """Seconds without a first token from `name` before a hedged request is sent."""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            window = self._windows[name]
+            if len(window) < self.min_samples:
+                return self.hedge_delay
+            return window.percentile(self.hedge_percentile)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, hedge and failover counts and per-provider latency, wins and breaker state."""
+        with self._lock:
+            stats: Dict[str, Any] = {
+                key: value for key, value in self._counters.items() if not key.startswith("wins:")
+            }
+            for name in self.providers:
+                window = self._windows[name]
+                stats[name] = {
+                    "p50_ms": (window.percentile(50) or 0.0) * 1000,
+                    "p95_ms": (window.percentile(95) or 0.0) * 1000,
+                    "wins": self._counters[f"wins:{name}"],
+                    "breaker": self._breakers[name].state,
+                }
+            return stats
+
+    def _rotation(self) -> List[str]:
+        with self._lock:
+            self._counters["requests"] += 1
+            names = [name for name in self.providers if self._breakers[name].available]
+        # With every breaker open, trying them all beats failing outright
+        return names or list(self.providers)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _record_latency(self, name: str, seconds: float):
+        with self._lock:
+            self._windows[name].add(seconds)
+
+    def _record_success(self, name: str, seconds: float):
+        with self._lock:
+            self._windows[name].add(seconds)
+            self._breakers[name].record_success()
+            self._counters[f"wins:{name}"] += 1
+
+    def _record_failure(self, name: str):
+        with self._lock:
+            self._breakers[name].record_failure()
+
+    @staticmethod
+    def _provider_config(name: str, run_manager) -> RunnableConfig:
+        # Explicit callbacks, so neither a thread nor a task's copied context decides where the
+        # provider run is reported: it nests under the pool run, which alone carries the request's
+        # tokens and timings
+        return {"callbacks": run_manager.get_child(f"provider:{name}") if run_manager else []}
+
+    def _pump(self, name, messages, stop, kwargs, config, events: queue.Queue, cancelled: threading.Event):
+        stream = self.providers[name].stream(messages, config, stop=stop, **kwargs)
+        try:
+            for chunk in stream:
+                if cancelled.is_set():
+                    return
+                events.put((name, "chunk", chunk))
+            events.put((name, "done", None))
+        except Exception as e:
+            events.put((name, "error", e))
+        finally:
+            stream.close()
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> Iterator[ChatGenerationChunk]:
+        events: queue.Queue = queue.Queue()
+        race = _Race(self)
+        attempts: Dict[str, threading.Event] = {}
+
+        def launch(name: str):
+            attempts[name] = threading.Event()
+            threading.Thread(
+                target=self._pump,
+                args=(
+                    name, messages, stop, kwargs, self._provider_config(name, run_manager), events, attempts[name]
+                ),
+                name=f"llm-{name}",
+                daemon=True,
+            ).start()
+
+        try:
+            launch(race.start_next())
+            while race.winner is None:
+                try:
+                    name, kind, payload = events.get(timeout=race.hedge_timeout())
+                except queue.Empty:
+                    launch(race.hedge())
+                    continue
+                if kind == "error":
+                    if race.fail(name, payload):
+                        raise payload
+                    if not race.running:
+                        launch(race.start_next())
+                    continue
+                for loser in race.win(name):
+                    attempts[loser].set()
+
+            while True:
+                if name == race.winner:
+                    if kind == "done":
+                        return
+                    if kind == "error":
+                        self._record_failure(name)
+                        raise payload
+                    chunk = ChatGenerationChunk(message=payload)
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                name, kind, payload = events.get()
+        finally:
+            for cancelled in attempts.values():
+                cancelled.set()
+
+    async def _apump(self, name, messages, stop, kwargs, config, events: asyncio.Queue):
+        try:
+            async for chunk in self.providers[name].astream(messages, config, stop=stop, **kwargs):
+                events.put_nowait((name, "chunk", chunk))
+            events.put_nowait((name, "done", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            events.put_nowait((name, "error", e))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        events: asyncio.Queue = asyncio.Queue()
+        race = _Race(self)
+        attempts: Dict[str, asyncio.Task] = {}
+
+        def launch(name: str):
+            attempts[name] = asyncio.create_task(
+                self._apump(name, messages, stop, kwargs, self._provider_config(name, run_manager), events)
+            )
+
+        try:
+            launch(race.start_next())
+            while race.winner is None:
+                try:
+                    name, kind, payload = await asyncio.wait_for(events.get(), race.hedge_timeout())
+                except asyncio.TimeoutError:
+                    launch(race.hedge())
+                    continue
+                if kind == "error":
+                    if race.fail(name, payload):
+                        raise payload
+                    if not race.running:
+                        launch(race.start_next())
+                    continue
+                for loser in race.win(name):
+                    attempts[loser].cancel()
+
+            while True:
+                if name == race.winner:
+                    if kind == "done":
+                        return
+                    if kind == "error":
+                        self._record_failure(name)
+                        raise payload
+                    chunk = ChatGenerationChunk(message=payload)
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+                name, kind, payload = await events.get()
+        finally:
+            for task in attempts.values():
+                task.cancel()
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
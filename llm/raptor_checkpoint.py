@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Stage outputs of one level, in the order they are produced
+STAGE_FILES = {
+    "embeddings": "embeddings.npy",
+    "clusters": "clusters.npz",
+    "summaries": "summaries.json",
+}
+_LEVEL_DIR = re.compile(r"^level_(\d+)$")
+
+
+def level_fingerprint(texts: List[str], *params: str) -> str:
+    """
+    Content hash of a level's input texts and the settings that shape its outputs.
+    """
+    digest = hashlib.sha256()
+    for part in list(params) + texts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BuildProgress:
+    """
+    Prints the progress and ETA of one build stage, at most every `interval` seconds.
+
+    Items already done when the stage starts, e.g. restored from a checkpoint, count towards
+    the progress but not towards the rate the ETA is based on. Safe to update from worker threads.
+
+    Args:
+        label (str): Stage name shown in the output.
+        total (int): Items in the stage.
+        done (int): Items already done.
+        interval (float): Minimum seconds between two reports.
+    """
+
+    def __init__(self, label: str, total: int, done: int = 0, interval: float = 10.0):
+        self.label = label
+        self.total = total
+        self.done = done
+        self.interval = interval
+        self._initial = done
+        self._started = time.monotonic()
+        self._reported = self._started
+        self._lock = threading.Lock()
+
+    def update(self, n: int = 1):
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if self.done < self.total and now - self._reported < self.interval:
+                return
+            self._reported = now
+            elapsed = now - self._started
+            line = (
+                f"--{self.label}: {self.done}/{self.total} ({self.done / max(self.total, 1):.0%}), "
+                f"{_format_seconds(elapsed)} elapsed"
+            )
+            rate = (self.done - self._initial) / elapsed if elapsed > 0 else 0.0
+            if self.done < self.total and rate > 0:
+                line += f", ETA {_format_seconds((self.total - self.done) / rate)}"
+            print(line + "--")
+
+
+class RaptorCheckpoint:
+    """
+    Per-level stage outputs of a RAPTOR build, so an interrupted build resumes where it stopped.
+
+    Each level has a directory holding the fingerprint of its inputs and, once each stage has
+    finished, its output: `embeddings.npy` (float32 matrix), `clusters.npz` (sparse row and
+    cluster id columns) and `summaries.json` (cluster id and summary columns). Summaries are
+    also appended to `summaries.partial.jsonl` as they arrive, so not even a partly summarized
+    level is lost. Stage files are written under a temporary name and renamed, so a crash
+    never leaves a half-written stage. A level whose fingerprint changed is discarded together
+    with every level above it.
+
+    Args:
+        build_dir (str): Directory holding the checkpoint.
+        resume (bool): Keep the outputs of an earlier build; otherwise the directory is cleared.
+    """
+
+    def __init__(self, build_dir: str, resume: bool = False):
+        self.build_dir = build_dir
+        if not resume and os.path.isdir(build_dir):
+            shutil.rmtree(build_dir)
+        os.makedirs(build_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, level: int, name: str) -> str:
+        return os.path.join(self.build_dir, f"level_{level}", name)
+
+    def _write(self, level: int, name: str, write: Callable):
+        path = self._path(level, name)
+        with open(path + ".tmp", "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _discard_from(self, level: int):
+        for entry in os.listdir(self.build_dir):
+            match = _LEVEL_DIR.match(entry)
+            if match and int(match.group(1)) >= level:
+                shutil.rmtree(os.path.join(self.build_dir, entry))
+
+    def start_level(self, level: int, fingerprint: str) -> List[str]:
+        """
+        Open `level` for inputs with `fingerprint` and return the stages it already finished.
+        """
+        meta_path = self._path(level, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)["fingerprint"] == fingerprint:
+                    return [
+                        stage for stage, name in STAGE_FILES.items() if os.path.exists(self._path(level, name))
+                    ]
+        self._discard_from(level)
+        os.makedirs(os.path.dirname(meta_path))
+        self._write(level, "meta.json", lambda f: f.write(json.dumps({"fingerprint": fingerprint}).encode()))
+        return []
+
+    def load_embeddings(self, level: int) -> Optional[np.ndarray]:
+        path = self._path(level, STAGE_FILES["embeddings"])
+        return np.load(path) if os.path.exists(path) else None
+
+    def save_embeddings(self, level: int, vectors: np.ndarray):
+        self._write(level, STAGE_FILES["embeddings"], lambda f: np.save(f, np.asarray(vectors, dtype=np.float32)))
+
+    def load_clusters(self, level: int) -> Optional[Tuple[np.ndarray, np.ndarray, int, int]]:
+        """(rows, clusters, n_rows, n_clusters) of the level's cluster assignments."""
+        path = self._path(level, STAGE_FILES["clusters"])
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            n_rows, n_clusters = data["shape"]
+            return data["rows"], data["clusters"], int(n_rows), int(n_clusters)
+
+    def save_clusters(self, level: int, rows: np.ndarray, clusters: np.ndarray, n_rows: int, n_clusters: int):
+        self._write(
+            level,
+            STAGE_FILES["clusters"],
+            lambda f: np.savez(f, rows=rows, clusters=clusters, shape=np.array([n_rows, n_clusters])),
+        )
+
+    def load_summaries(self, level: int) -> Optional[Dict[int, str]]:
+        """Summary of every cluster, once the level's summaries stage has finished."""
+        path = self._path(level, STAGE_FILES["summaries"])
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            columns = json.load(f)
+        return dict(zip(columns["cluster"], columns["summary"]))
+
+    def partial_summaries(self, level: int) -> Dict[int, str]:
+        """Summaries stored by an unfinished summaries stage."""
+        summaries = {}
+        path = self._path(level, "summaries.partial.jsonl")
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by a crash
+                    summaries[row["cluster"]] = row["summary"]
+        return summaries
+
+    def add_summary(self, level: int, cluster: int, summary: str):
+        with self._lock:
+            with open(self._path(level, "summaries.partial.jsonl"), "a") as f:
+                f.write(json.dumps({"cluster": cluster, "summary": summary}) + "\n")
+
+    def save_summaries(self, level: int, summaries: Dict[int, str]):
+        columns = {"cluster": list(summaries), "summary": list(summaries.values())}
+        self._write(level, STAGE_FILES["summaries"], lambda f: f.write(json.dumps(columns).encode()))
+        partial = self._path(level, "summaries.partial.jsonl")
+        if os.path.exists(partial):
+            os.remove(partial)
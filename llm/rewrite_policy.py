@@ -0,0 +1,194 @@
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.retrievers import RetrieverLike
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+REWRITE_MODES = ("rewrite", "single_call")
+
+# Words that usually point back at something said earlier in the conversation
+_REFERENCE_WORDS = re.compile(
+    r"\b(it|its|it's|itself|that|this|these|those|they|them|their|theirs|he|him|his|she|her|hers|"
+    r"there|then|such|same|former|latter|above|previous|earlier|again|more|else|also|one|ones)\b",
+    re.IGNORECASE,
+)
+# Openings of elliptical follow-ups ("and for kids?", "what about sleep?", "why?")
+_FOLLOW_UP_OPENERS = re.compile(
+    r"^\s*(and|but|or|so|also|what about|how about|why|how come|really|ok|okay|same)\b",
+    re.IGNORECASE,
+)
+_MIN_SELF_CONTAINED_WORDS = 4
+
+
+def needs_rewrite(question: str) -> bool:
+    """
+    Heuristically decide whether a follow-up question depends on the chat history.
+
+    Returns False only for questions that are long enough to stand alone and contain no
+    pronouns, demonstratives or elliptical openers, so they can go to retrieval as they are.
+    """
+    if len(question.split()) < _MIN_SELF_CONTAINED_WORDS:
+        return True
+    if _FOLLOW_UP_OPENERS.search(question):
+        return True
+    return bool(_REFERENCE_WORDS.search(question))
+
+
+class RewriteStats:
+    """
+    Thread-safe counters of rewrite-policy decisions.
+
+    Decisions: 'no_history', 'bypassed', 'cache_hit', 'single_call' (no rewrite call made)
+    and 'rewritten' (one LLM call made).
+    """
+
+    SAVING_DECISIONS = ("bypassed", "cache_hit", "single_call")
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, decision: str):
+        with self._lock:
+            self._counts[decision] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["llm_calls_saved"] = sum(counts.get(d, 0) for d in self.SAVING_DECISIONS)
+        return counts
+
+
+def _message_text(message) -> str:
+    if isinstance(message, BaseMessage):
+        return f"{message.type}:{message.content}"
+    return f"str:{message}"
+
+
+class RewriteCache:
+    """
+    LRU cache of standalone questions keyed by a hash of the chat history and the input.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chat_history: List, question: str) -> str:
+        digest = hashlib.sha256()
+        for message in chat_history:
+            digest.update(_message_text(message).encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(question.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+rewrite_stats = RewriteStats()
+rewrite_cache = RewriteCache()
+
+
+def _last_human_text(chat_history: List) -> str:
+    for message in reversed(chat_history):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
+
+def create_rewrite_policy_retriever(
+    llm: BaseLanguageModel,
+    retriever: RetrieverLike,
+    prompt: BasePromptTemplate,
+    mode: str = "rewrite",
+    cache: Optional[RewriteCache] = None,
+    stats: Optional[RewriteStats] = None,
+) -> Runnable:
+    """
+    Drop-in replacement for `create_history_aware_retriever` that avoids the rewrite LLM call when it can.
+
+    For each turn with history, the question goes straight to the retriever if `needs_rewrite`
+    finds nothing to resolve; otherwise a cached rewrite is reused if the same history and input
+    were seen before. In 'rewrite' mode the remaining turns are reformulated by the LLM. In
+    'single_call' mode they are never reformulated: retrieval uses the previous user message plus
+    the question, and the answer prompt resolves the references in the same call as the answer.
+
+    Args:
+        llm: Language model used for rewriting.
+        retriever: Retriever receiving the (possibly rewritten) question.
+        prompt: Contextualize prompt taking `chat_history` and `input`.
+        mode (str): 'rewrite' or 'single_call'.
+        cache (RewriteCache): Rewrite cache; defaults to the process-wide cache.
+        stats (RewriteStats): Decision counters; defaults to the process-wide counters.
+
+    Returns:
+        Runnable: Takes `input` and `chat_history` and returns retrieved documents.
+    """
+    if mode not in REWRITE_MODES:
+        raise ValueError(f"Unsupported rewrite mode: {mode}")
+    cache = cache if cache is not None else rewrite_cache
+    stats = stats if stats is not None else rewrite_stats
+    rewrite_chain = prompt | llm | StrOutputParser()
+
+    def decide(inputs: Dict):
+        """Return (query, cache key); a cache key means the LLM still has to rewrite."""
+        question = inputs["input"]
+        chat_history = inputs.get("chat_history") or []
+        if not chat_history:
+            stats.record("no_history")
+            return question, None
+        if not needs_rewrite(question):
+            stats.record("bypassed")
+            return question, None
+        if mode == "single_call":
+            stats.record("single_call")
+            return f"{_last_human_text(chat_history)}\n{question}".strip(), None
+        key = cache.key(chat_history, question)
+        cached = cache.get(key)
+        if cached is not None:
+            stats.record("cache_hit")
+            return cached, None
+        return None, key
+
+    def route(inputs: Dict, config: RunnableConfig) -> str:
+        query, key = decide(inputs)
+        if key is None:
+            return query
+        query = rewrite_chain.invoke(inputs, config)
+        cache.put(key, query)
+        stats.record("rewritten")
+        return query
+
+    async def aroute(inputs: Dict, config: RunnableConfig) -> str:
+        query, key = decide(inputs)
+        if key is None:
+            return query
+        query = await rewrite_chain.ainvoke(inputs, config)
+        cache.put(key, query)
+        stats.record("rewritten")
+        return query
+
+    return (RunnableLambda(route, afunc=aroute) | retriever).with_config(
+        run_name="chat_retriever_chain"
+    )
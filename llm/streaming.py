@@ -0,0 +1,103 @@
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.runnables import Runnable
+
+
+@dataclass
+class StreamStats:
+    """
+    Timing and output collected while streaming a retrieval chain answer.
+
+    Attributes:
+        started_at (float): perf_counter timestamp when the request was sent.
+        first_token_at (float): perf_counter timestamp of the first answer token.
+        finished_at (float): perf_counter timestamp when the stream was exhausted.
+        context (List[Document]): documents retrieved for the answer.
+        tokens (List[str]): answer tokens in the order they arrived.
+    """
+
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    context: List[Document] = field(default_factory=list)
+    tokens: List[str] = field(default_factory=list)
+
+    @property
+    def answer(self) -> str:
+        return "".join(self.tokens)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total_time(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def _record(self, chunk: Dict) -> Optional[str]:
+        """Update the stats from one chain output chunk and return its answer token, if any."""
+        if "context" in chunk:
+            self.context = chunk["context"]
+        token = chunk.get("answer")
+        if not token:
+            return None
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens.append(token)
+        return token
+
+
+def stream_answer(
+    conversation_chain: Runnable, inputs: Dict, stats: Optional[StreamStats] = None
+) -> Iterator[str]:
+    """
+    Stream the answer of a `create_retrieval_chain` chain token by token.
+
+    The retrieval chain yields dict chunks carrying the retrieved `context` and incremental
+    `answer` pieces; only the answer pieces are yielded, as soon as the LLM produces them.
+
+    Args:
+        conversation_chain (Runnable): The conversational retrieval chain.
+        inputs (Dict): Chain inputs, usually `input` and `chat_history`.
+        stats (StreamStats): Optional stats object that is filled in while streaming.
+
+    Yields:
+        str: Answer tokens.
+    """
+    stats = stats if stats is not None else StreamStats()
+    stats.started_at = time.perf_counter()
+    for chunk in conversation_chain.stream(inputs):
+        token = stats._record(chunk)
+        if token:
+            yield token
+    stats.finished_at = time.perf_counter()
+
+
+async def astream_answer(
+    conversation_chain: Runnable, inputs: Dict, stats: Optional[StreamStats] = None
+) -> AsyncIterator[str]:
+    """
+    Async counterpart of `stream_answer`, consuming `conversation_chain.astream`.
+
+    Args:
+        conversation_chain (Runnable): The conversational retrieval chain.
+        inputs (Dict): Chain inputs, usually `input` and `chat_history`.
+        stats (StreamStats): Optional stats object that is filled in while streaming.
+
+    Yields:
+        str: Answer tokens.
+    """
+    stats = stats if stats is not None else StreamStats()
+    stats.started_at = time.perf_counter()
+    async for chunk in conversation_chain.astream(inputs):
+        token = stats._record(chunk)
+        if token:
+            yield token
+    stats.finished_at = time.perf_counter()
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from langchain_core.runnables import Runnable
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) used for rate limiting."""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter for requests per minute and tokens per minute.
+
+    Callers reserve capacity up front and sleep for the returned delay, so the same
+    limiter serves both the thread pool and the asyncio executor.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = requests_per_minute or 0.0
+        self._tokens = tokens_per_minute or 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Take one request and `tokens` tokens from the buckets.
+
+        Returns:
+            float: Seconds the caller has to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last
+            self._last = now
+            wait = 0.0
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60.0
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * rate) - 1
+                wait = max(wait, -self._requests / rate)
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60.0
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate) - tokens
+                wait = max(wait, -self._tokens / rate)
+            return wait
+
+    def acquire(self, tokens: int = 0):
+        time.sleep(self.reserve(tokens))
+
+    async def aacquire(self, tokens: int = 0):
+        await asyncio.sleep(self.reserve(tokens))
+
+
+def is_retryable(exc: Exception) -> bool:
+    """
+    Decide whether a failed LLM call is worth retrying (rate limits, timeouts, 5xx).
+    """
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    message = str(exc).lower()
+    return "429" in message or "rate limit" in message
+
+
+class SummarizationExecutor:
+    """
+    Run a summarization chain over many cluster contexts concurrently.
+
+    Results always come back in the order of the input contexts.
+
+    Args:
+        max_concurrency (int): Maximum number of in-flight LLM calls.
+        mode (str): 'thread' to use a thread pool around `invoke`, 'async' to use `ainvoke`.
+        rate_limiter (RateLimiter): Optional requests/tokens per minute limiter.
+        max_retries (int): Retries per context for retryable errors.
+        backoff_base (float): First retry delay in seconds, doubled on each attempt.
+        backoff_max (float): Upper bound for a single retry delay.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        mode: str = "thread",
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        if mode not in ("thread", "async"):
+            raise ValueError(f"Unsupported summarization mode: {mode}")
+        self.max_concurrency = max(1, max_concurrency)
+        self.mode = mode
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SummarizationExecutor":
+        """
+        Build an executor from SUMMARY_CONCURRENCY, SUMMARY_MODE, SUMMARY_RPM, SUMMARY_TPM
+        and SUMMARY_MAX_RETRIES environment variables.
+        """
+        rpm = os.getenv("SUMMARY_RPM")
+        tpm = os.getenv("SUMMARY_TPM")
+        rate_limiter = None
+        if rpm or tpm:
+            rate_limiter = RateLimiter(
+                requests_per_minute=float(rpm) if rpm else None,
+                tokens_per_minute=float(tpm) if tpm else None,
+            )
+        return cls(
+            max_concurrency=int(os.getenv("SUMMARY_CONCURRENCY", "4")),
+            mode=os.getenv("SUMMARY_MODE", "thread"),
+            rate_limiter=rate_limiter,
+            max_retries=int(os.getenv("SUMMARY_MAX_RETRIES", "5")),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        with self._retries_lock:
+            self.retries += 1
+        delay = min(self.backoff_max, self.backoff_base * 2**attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _summarize(self, chain: Runnable, context: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimate_tokens(context))
+            try:
+                return chain.invoke({"context": context})
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                time.sleep(self._backoff(attempt))
+
+    async def _asummarize(self, chain: Runnable, context: str, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                if self.rate_limiter:
+                    await self.rate_limiter.aacquire(estimate_tokens(context))
+                try:
+                    return await chain.ainvoke({"context": context})
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    await asyncio.sleep(self._backoff(attempt))
+
+    async def amap(
+        self,
+        chain: Runnable,
+        contexts: List[str],
+        on_result: Optional[Callable[[int, str], None]] = None,
+    ) -> List[str]:
+        """
+        Summarize every context with `chain.ainvoke`, at most `max_concurrency` at a time.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(i: int, context: str) -> str:
+            summary = await self._asummarize(chain, context, semaphore)
+            if on_result:
+                on_result(i, summary)
+            return summary
+
+        return list(await asyncio.gather(*(run(i, c) for i, c in enumerate(contexts))))
+
+    def map(
+        self,
+        chain: Runnable,
+        contexts: List[str],
+        on_result: Optional[Callable[[int, str], None]] = None,
+    ) -> List[str]:
+        """
+        Summarize every context, returning the summaries in input order.
+
+        Args:
+            chain (Runnable): Summarization chain taking a `context` input.
+            contexts (List[str]): Formatted cluster texts.
+            on_result (Callable): Optional callback `(index, summary)` invoked as each summary completes.
+        """
+        if self.mode == "async":
+            return asyncio.run(self.amap(chain, contexts, on_result))
+
+        def run(i: int, context: str) -> str:
+            summary = self._summarize(chain, context)
+            if on_result:
+                on_result(i, summary)
+            return summary
+
+        if self.max_concurrency == 1:
+            return [run(i, context) for i, context in enumerate(contexts)]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(run, range(len(contexts)), contexts))
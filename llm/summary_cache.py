@@ -0,0 +1,115 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def model_identifier(model) -> str:
+    """
+    Best-effort stable name of a chat model, used as part of cache keys.
+    """
+    for attr in ("model_name", "model", "deployment_name"):
+        value = getattr(model, attr, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(model).__name__
+
+
+def summary_key(context: str, template: str, model_name: str) -> str:
+    """
+    Content hash of everything that determines a cluster summary.
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, template, context):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent content-addressed store of cluster summaries backed by SQLite.
+
+    Entries are evicted least-recently-used first once the stored summaries exceed
+    `max_bytes`. Safe to share between the summarization worker threads.
+
+    Args:
+        path (str): SQLite file holding the cache.
+        max_bytes (int): Size budget for the stored summaries.
+    """
+
+    def __init__(self, path: str = ".cache/summaries.sqlite", max_bytes: int = 512 * 1024**2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["SummaryCache"]:
+        """
+        Build the cache from SUMMARY_CACHE_PATH and SUMMARY_CACHE_MAX_MB.
+        Setting SUMMARY_CACHE_PATH to an empty string disables caching.
+        """
+        path = os.getenv("SUMMARY_CACHE_PATH", ".cache/summaries.sqlite")
+        if not path:
+            return None
+        max_mb = float(os.getenv("SUMMARY_CACHE_MAX_MB", "512"))
+        return cls(path, int(max_mb * 1024**2))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, summary: str):
+        size = len(summary.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, summary, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM summaries ORDER BY last_used ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+
+    def stats(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,304 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .summarization import estimate_tokens
+
+# Durations recorded per request, in seconds
+STAGES = (
+    "rewrite",
+    "query_embedding",
+    "search",
+    "packing",
+    "retrieval",
+    "time_to_first_token",
+    "generation",
+    "total",
+)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PrometheusMetrics:
+    """
+    Cumulative per-stage latency histograms and token counters in Prometheus text format.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]):
+        with self._lock:
+            for stage in STAGES:
+                seconds = trace.get(f"{stage}_ms")
+                if seconds is None:
+                    continue
+                seconds /= 1000
+                counts = self._histograms.setdefault(stage, [0] * (len(self.buckets) + 1))
+                counts[bisect.bisect_left(self.buckets, seconds)] += 1
+                self._sums[stage] = self._sums.get(stage, 0.0) + seconds
+            status = "error" if trace.get("error") else "ok"
+            for key, value in (
+                (f'chatbot_requests_total{{status="{status}"}}', 1),
+                ('chatbot_tokens_total{kind="prompt"}', trace.get("prompt_tokens", 0)),
+                ('chatbot_tokens_total{kind="completion"}', trace.get("completion_tokens", 0)),
+                ('chatbot_tokens_total{kind="context"}', trace.get("context_tokens", 0)),
+            ):
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        lines = [
+            "# HELP chatbot_stage_seconds Duration of each chat request stage.",
+            "# TYPE chatbot_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, counts in self._histograms.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'chatbot_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'chatbot_stage_seconds_sum{{stage="{stage}"}} {self._sums[stage]}')
+                lines.append(f'chatbot_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+            lines += [
+                "# HELP chatbot_requests_total Chat requests by outcome.",
+                "# TYPE chatbot_requests_total counter",
+                "# HELP chatbot_tokens_total Prompt, completion and retrieved-context tokens.",
+                "# TYPE chatbot_tokens_total counter",
+            ]
+            lines += [f"{key} {value}" for key, value in sorted(self._counters.items())]
+        return "\n".join(lines) + "\n"
+
+
+class JsonlExporter:
+    """
+    Append one JSON line per request to a size-rotated file.
+
+    Args:
+        path (str): File to write.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Rotated files kept.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._logger = logging.getLogger(f"{__name__}.jsonl.{path}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        if not self._logger.handlers:
+            self._logger.addHandler(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count))
+
+    def export(self, trace: Dict[str, Any]):
+        self._logger.info(json.dumps(trace))
+
+
+class _Request:
+    __slots__ = ("trace", "started", "retrieved", "runs")
+
+    def __init__(self):
+        self.trace: Dict[str, Any] = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.started = time.perf_counter()
+        self.retrieved = False
+        # run_id -> [stage, start time, streamed tokens, prompt tokens] of LLM and retriever runs
+        self.runs: Dict[UUID, list] = {}
+
+
+class RequestTracer(BaseCallbackHandler):
+    """
+    Callback handler that records where the time of each chat request goes.
+
+    Per top-level chain run it records the rewrite LLM call, the query embedding, the index
+    search and context packing (reported by `PackedRetriever`), the whole retrieval, the
+    retrieved context size, time to first answer token, generation time and token counts.
+    Chat-model calls that start before the request's retrieval finished count as the
+    rewrite, later ones as generation; chat-model calls nested in another one, such as the
+    provider attempts of a `ProviderPool`, are not counted. Finished requests go to every exporter.
+
+    Args:
+        exporters (List): Objects with an `export(trace: dict)` method.
+    """
+
+    def __init__(self, exporters: Optional[List] = None):
+        self.exporters = exporters or []
+        self.metrics = next((e for e in self.exporters if isinstance(e, PrometheusMetrics)), None)
+        self._requests: Dict[UUID, _Request] = {}
+        self._roots: Dict[UUID, UUID] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestTracer"]:
+        """
+        Tracer with in-process Prometheus metrics, plus a JSONL file when TRACE_JSONL_PATH is set
+        (rotated at TRACE_JSONL_MAX_MB). TRACING=0 disables tracing.
+        """
+        if os.getenv("TRACING", "1") == "0":
+            return None
+        exporters: List = [PrometheusMetrics()]
+        path = os.getenv("TRACE_JSONL_PATH")
+        if path:
+            max_bytes = int(float(os.getenv("TRACE_JSONL_MAX_MB", "10")) * 1024 * 1024)
+            exporters.append(JsonlExporter(path, max_bytes))
+        return cls(exporters)
+
+    def _request(self, run_id: UUID) -> Optional[_Request]:
+        root = self._roots.get(run_id)
+        return self._requests.get(root) if root is not None else None
+
+    def _track(self, run_id: UUID, parent_run_id: Optional[UUID]) -> Optional[_Request]:
+        with self._lock:
+            if parent_run_id is None:
+                self._roots[run_id] = run_id
+                self._requests[run_id] = _Request()
+            elif parent_run_id in self._roots:
+                self._roots[run_id] = self._roots[parent_run_id]
+            return self._request(run_id)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._track(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is None:
+            self._finish(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        request = self._track(run_id, parent_run_id)
+        if request is None:
+            return
+        stage = "generation" if request.retrieved else "rewrite"
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for batch in messages for m in batch)
+        with self._lock:
+            parent = request.runs.get(parent_run_id)
+            if parent is not None and parent[0] != "retrieval":
+                # A provider call made by a `ProviderPool`; only the pool's own run is counted
+                return
+            request.runs[run_id] = [stage, time.perf_counter(), 0, prompt_tokens]
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            request = self._request(run_id)
+            run = request.runs.get(run_id) if request else None
+            if run is None:
+                return
+            run[2] += 1
+            if run[0] == "generation" and "time_to_first_token_ms" not in request.trace:
+                request.trace["time_to_first_token_ms"] = (time.perf_counter() - request.started) * 1000
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            request = self._request(run_id)
+            run = request.runs.pop(run_id, None) if request else None
+            if run is None:
+                return
+            stage, started, streamed, prompt_tokens = run
+            trace = request.trace
+            trace[f"{stage}_ms"] = trace.get(f"{stage}_ms", 0.0) + (time.perf_counter() - started) * 1000
+            usage = _usage(response)
+            trace["prompt_tokens"] += usage.get("input_tokens", prompt_tokens)
+            trace["completion_tokens"] += usage.get("output_tokens", streamed or _completion_tokens(response))
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        request = self._track(run_id, parent_run_id)
+        if request is not None:
+            with self._lock:
+                request.runs[run_id] = ["retrieval", time.perf_counter(), 0, 0]
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        with self._lock:
+            request = self._request(run_id)
+            run = request.runs.pop(run_id, None) if request else None
+            if run is None:
+                return
+            request.retrieved = True
+            request.trace["retrieval_ms"] = (time.perf_counter() - run[1]) * 1000
+            request.trace["context_docs"] = len(documents)
+            request.trace["context_tokens"] = sum(estimate_tokens(d.page_content) for d in documents)
+
+    def on_text(self, text, *, run_id, **kwargs):
+        # `PackedRetriever` reports its internal timings through its run manager
+        timings = kwargs.get("retrieval_timings")
+        if not timings:
+            return
+        with self._lock:
+            request = self._request(run_id)
+            if request is not None:
+                request.trace.update(timings)
+
+    def _finish(self, run_id: UUID, error: Optional[BaseException] = None):
+        with self._lock:
+            request = self._requests.pop(run_id, None)
+            for child in [r for r, root in self._roots.items() if root == run_id]:
+                del self._roots[child]
+        if request is None:
+            return
+        trace = request.trace
+        trace["request_id"] = str(run_id)
+        trace["total_ms"] = (time.perf_counter() - request.started) * 1000
+        trace["timestamp"] = time.time()
+        if error is not None:
+            trace["error"] = type(error).__name__
+        for exporter in self.exporters:
+            exporter.export(trace)
+
+
+def _usage(response) -> Dict[str, int]:
+    try:
+        return response.generations[0][0].message.usage_metadata or {}
+    except (AttributeError, IndexError):
+        return {}
+
+
+def _completion_tokens(response) -> int:
+    return sum(estimate_tokens(g.text) for generations in response.generations for g in generations)
+
+
+_request_tracer: Dict[str, Optional[RequestTracer]] = {}
+_request_tracer_lock = threading.Lock()
+
+
+def get_request_tracer() -> Optional[RequestTracer]:
+    """Process-wide `RequestTracer.from_env()`, shared by every chain and the metrics endpoint."""
+    with _request_tracer_lock:
+        if "tracer" not in _request_tracer:
+            _request_tracer["tracer"] = RequestTracer.from_env()
+        return _request_tracer["tracer"]
+
+
+def start_metrics_server(port: int, tracer: RequestTracer):
+    """
+    Serve `tracer`'s Prometheus metrics at http://0.0.0.0:<port>/metrics from a daemon thread.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics" or tracer.metrics is None:
+                self.send_error(404)
+                return
+            body = tracer.metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -1,28 +1,138 @@
+import glob
 import os
-from typing import List
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 
+# Whitespace-delimited pieces of text, each keeping its trailing whitespace
+_UNIT_PATTERN = re.compile(r"\S+\s*")
+# Word-piece approximation: words, long words split every 6 characters, punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w{1,6}|[^\w\s]")
 
-def load_and_split_documents(directory_path: str = "data") -> List[str]:
+
+def approximate_token_count(text: str) -> int:
     """
-    Load PDF documents from a directory.
+    Cheap approximation of a WordPiece tokenizer's token count.
 
     Parameters:
-        directory_path (int): folder path of data.
+        text (str): text to measure.
 
     Returns:
-        list: List of document chunks.
+        int: approximate number of tokens.
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def iter_pdf_pages(directory_path: str = "data") -> Iterator[Document]:
     """
+    Lazily yield the pages of every PDF under a directory, one file at a time.
 
+    Parameters:
+        directory_path (str): folder path of data.
+
+    Yields:
+        Document: a page with `source` and `page` metadata.
+    """
     if not os.path.isdir(directory_path):
         raise ValueError(f"Directory path not found: {directory_path}")
 
-    pdf_loader = DirectoryLoader(
-        directory_path, glob="**/*.pdf", loader_cls=PyPDFLoader
-    )
-    docs = pdf_loader.load()
+    for path in sorted(glob.glob(os.path.join(directory_path, "**", "*.pdf"), recursive=True)):
+        yield from PyPDFLoader(path).lazy_load()
+
+
+def iter_token_chunks(
+    pages: Iterable[Document],
+    chunk_size: int = 256,
+    chunk_overlap: int = 32,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> Iterator[Document]:
+    """
+    Split pages into chunks of at most `chunk_size` tokens as the pages stream in.
+
+    Chunks never span pages, so each keeps the page's `source` and `page` metadata, plus
+    its position on the page under `chunk`. Consecutive chunks of a page share up to
+    `chunk_overlap` tokens. A single word longer than `chunk_size` becomes its own chunk.
+
+    Parameters:
+        pages (Iterable[Document]): pages to split, e.g. from `iter_pdf_pages`.
+        chunk_size (int): maximum tokens per chunk.
+        chunk_overlap (int): tokens repeated between consecutive chunks.
+        count_tokens (Callable[[str], int]): token counter; defaults to `approximate_token_count`.
+
+    Yields:
+        Document: token-bounded chunks.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    count_tokens = count_tokens or approximate_token_count
+
+    for page in pages:
+        units = _UNIT_PATTERN.findall(page.page_content)
+        counts = [count_tokens(unit) for unit in units]
+        start = 0
+        chunk_index = 0
+        while start < len(units):
+            end = start
+            total = 0
+            while end < len(units) and (end == start or total + counts[end] <= chunk_size):
+                total += counts[end]
+                end += 1
 
-    docs_texts = [d.page_content for d in docs]
+            text = "".join(units[start:end]).strip()
+            if text:
+                yield Document(
+                    page_content=text,
+                    metadata={**page.metadata, "chunk": chunk_index},
+                )
+                chunk_index += 1
+            if end >= len(units):
+                break
 
-    return docs_texts
+            # Step back over the tail of this chunk to seed the next one
+            overlap = 0
+            next_start = end
+            while next_start > start + 1 and overlap + counts[next_start - 1] <= chunk_overlap:
+                next_start -= 1
+                overlap += counts[next_start]
+            start = next_start
+
+
+def load_and_split_documents(
+    directory_path: str = "data", chunk_size: int = 256, chunk_overlap: int = 32
+) -> List[str]:
+    """
+    Load PDF documents from a directory and split them into token-bounded chunks.
+
+    Parameters:
+        directory_path (str): folder path of data.
+        chunk_size (int): maximum tokens per chunk.
+        chunk_overlap (int): tokens repeated between consecutive chunks.
+
+    Returns:
+        list: List of document chunks.
+    """
+    chunks = iter_token_chunks(iter_pdf_pages(directory_path), chunk_size, chunk_overlap)
+    return [chunk.page_content for chunk in chunks]
+
+
+def load_documents_by_source(
+    directory_path: str = "data", chunk_size: int = 256, chunk_overlap: int = 32
+) -> Dict[str, List[Document]]:
+    """
+    Load and split PDF documents from a directory, grouped by source file.
+
+    Parameters:
+        directory_path (str): folder path of data.
+        chunk_size (int): maximum tokens per chunk.
+        chunk_overlap (int): tokens repeated between consecutive chunks.
+
+    Returns:
+        dict: chunks with their `source`, `page` and `chunk` metadata, keyed by the path of
+            the PDF they came from.
+    """
+    source_chunks = {}
+    for chunk in iter_token_chunks(iter_pdf_pages(directory_path), chunk_size, chunk_overlap):
+        source_chunks.setdefault(chunk.metadata["source"], []).append(chunk)
+    return source_chunks
@@ -1,27 +1,81 @@
+"""
+Build or update the RAPTOR FAISS index from the PDFs in the data directory.
+
+Each level's embeddings, cluster assignments and summaries are checkpointed in the build
+directory as they finish; `--resume` continues an interrupted build from there.
+
+    python vector_saver.py
+    python vector_saver.py --resume
+"""
+import argparse
+import json
+import os
+
 from dotenv import load_dotenv
 
-from document_utils import load_and_split_documents
-from db import save_to_faiss
+from document_utils import load_documents_by_source
+from db import update_faiss
+from db.manifest import chunk_ids, file_sha256, texts_sha256
+from db.raptor_tree import raptor_summary_metadata
 from llm import recursive_embed_cluster_summarize
+from llm.raptor_checkpoint import RaptorCheckpoint
+
+# Manifest key under which the RAPTOR summaries of all levels are tracked
+RAPTOR_SUMMARY_SOURCE = "raptor:summaries"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", action="store_true", help="Reuse the stages an interrupted build finished")
+    parser.add_argument("--build-dir", default=os.getenv("RAPTOR_BUILD_DIR", ".cache/raptor_build"))
+    parser.add_argument("--levels", type=int, default=3)
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+
+    # Load and split documents
+    source_documents = load_documents_by_source()
+    source_hashes = {source: file_sha256(source) for source in source_documents}
+    source_chunks = {
+        source: [doc.page_content for doc in docs] for source, docs in source_documents.items()
+    }
+    source_metadatas = {
+        source: [{**doc.metadata, "level": 0} for doc in docs] for source, docs in source_documents.items()
+    }
 
-load_dotenv(override=True)
+    # Build tree
+    leaf_texts = [text for chunks in source_chunks.values() for text in chunks]
+    leaf_ids = [
+        chunk_id
+        for source, chunks in source_chunks.items()
+        for chunk_id in chunk_ids(source, source_hashes[source], len(chunks))
+    ]
+    results = recursive_embed_cluster_summarize(
+        leaf_texts, level=1, n_levels=args.levels, checkpoint=RaptorCheckpoint(args.build_dir, args.resume)
+    )
 
-# Load and split documents
-docs_texts = load_and_split_documents()
+    # Collect the summaries from each level
+    summaries = []
+    for level in sorted(results.keys()):
+        # Extract summaries from the current level's DataFrame
+        summaries.extend(results[level][1]["summaries"].tolist())
 
-# Build tree
-leaf_texts = docs_texts
-results = recursive_embed_cluster_summarize(leaf_texts, level=1, n_levels=3)
+    # The tree layout is part of the hash, so re-clustering unchanged summaries still updates their links
+    layout = json.dumps(
+        [[[int(c) for c in clusters] for clusters in results[level][0]["cluster"]] for level in sorted(results)]
+    )
+    summary_hash = texts_sha256(summaries + leaf_ids + [layout])
+    summary_ids = chunk_ids(RAPTOR_SUMMARY_SOURCE, summary_hash, len(summaries))
 
-# Initialize all_texts with leaf_texts
-all_texts = leaf_texts.copy()
+    source_chunks[RAPTOR_SUMMARY_SOURCE] = summaries
+    source_hashes[RAPTOR_SUMMARY_SOURCE] = summary_hash
+    source_metadatas[RAPTOR_SUMMARY_SOURCE] = raptor_summary_metadata(results, leaf_ids, summary_ids)
 
-# Iterate through the results to extract summaries from each level and add them to all_texts
-for level in sorted(results.keys()):
-    # Extract summaries from the current level's DataFrame
-    summaries = results[level][1]["summaries"].tolist()
-    # Extend all_texts with the summaries from the current level
-    all_texts.extend(summaries)
+    # Only new, changed or removed sources touch the index
+    changes = update_faiss(source_chunks, source_hashes, source_metadatas=source_metadatas)
+    for change, sources in changes.items():
+        print(f"--{change}: {len(sources)} sources--")
 
-save_to_faiss(all_texts)
 
+if __name__ == "__main__":
+    main()
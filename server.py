@@ -0,0 +1,193 @@
+"""
+Headless HTTP entry point serving the chatbot over Server-Sent Events.
+
+Builds the same retriever and chain as the Streamlit app, keeps each conversation's
+history server-side and answers many conversations concurrently on one asyncio loop.
+
+    python server.py --host 0.0.0.0 --port 8080
+
+Endpoints:
+    POST /chat              {"message": ..., "session_id": ..., "stream": true}
+                            Streams `session`, `token`, `done` (or `error`) SSE events;
+                            with "stream": false returns one JSON answer instead.
+    DELETE /sessions/{id}   Forget a conversation.
+    GET /health             Liveness and number of open sessions.
+    GET /metrics            Per-stage latency and token metrics in Prometheus text format.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from db.db_helper import load_faiss_vector_store
+from db.manifest import index_version
+from llm.answer_cache import SemanticAnswerCache, answer_cache_policy
+from llm.conversation_memory import create_summary_chain
+from llm.langchain_utils import create_conversational_chain, get_chat_model
+from llm.streaming import StreamStats, astream_answer
+from llm.tracing import get_request_tracer
+from app_utils.session_store import SessionStore
+
+DB_PATH = "faiss_db_raptor"
+
+CHAIN = web.AppKey("chain", object)
+ANSWER_CACHE = web.AppKey("answer_cache", object)
+SESSIONS = web.AppKey("sessions", SessionStore)
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def _cached_answer(answer_cache, question: str):
+    if answer_cache is None:
+        return None
+    # The lookup may embed the question; keep it off the event loop
+    return await asyncio.to_thread(answer_cache.lookup, question)
+
+
+async def _store_answer(answer_cache, question: str, answer: str):
+    if answer_cache is not None and answer:
+        await asyncio.to_thread(answer_cache.store, question, answer)
+
+
+async def chat(request: web.Request) -> web.StreamResponse:
+    try:
+        body = await request.json()
+        question = body["message"].strip()
+    except (ValueError, KeyError, AttributeError, TypeError):
+        raise web.HTTPBadRequest(text='Expected a JSON body with a "message" string')
+    if not question:
+        raise web.HTTPBadRequest(text="Empty message")
+
+    app = request.app
+    session = app[SESSIONS].get(body.get("session_id"))
+    async with session.lock:
+        memory = session.memory
+        # Only first-turn answers are stored; later ones may repeat this session's history
+        may_look_up, may_store = answer_cache_policy(len(memory), question)
+        started_at = time.perf_counter()
+        cached = await _cached_answer(app[ANSWER_CACHE], question) if may_look_up else None
+        inputs = {"input": question, "chat_history": memory.messages()}
+
+        if not body.get("stream", True):
+            if cached is not None:
+                answer = cached
+            else:
+                answer = (await app[CHAIN].ainvoke(inputs))["answer"]
+                if may_store:
+                    await _store_answer(app[ANSWER_CACHE], question, answer)
+            memory.add_turn(question, answer)
+            return web.json_response(
+                {
+                    "session_id": session.session_id,
+                    "answer": answer,
+                    "cached": cached is not None,
+                    "total_time": time.perf_counter() - started_at,
+                }
+            )
+
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        await response.write(_sse("session", {"session_id": session.session_id}))
+
+        if cached is not None:
+            await response.write(_sse("token", {"text": cached}))
+            memory.add_turn(question, cached)
+            elapsed = time.perf_counter() - started_at
+            await response.write(
+                _sse(
+                    "done",
+                    {"answer": cached, "cached": True, "time_to_first_token": elapsed, "total_time": elapsed},
+                )
+            )
+            return response
+
+        stats = StreamStats()
+        try:
+            async for token in astream_answer(app[CHAIN], inputs, stats):
+                await response.write(_sse("token", {"text": token}))
+        except ConnectionResetError:
+            # Client went away; the partial answer is not kept
+            return response
+        except Exception as e:
+            await response.write(_sse("error", {"message": str(e)}))
+            return response
+
+        memory.add_turn(question, stats.answer)
+        if may_store:
+            await _store_answer(app[ANSWER_CACHE], question, stats.answer)
+        await response.write(
+            _sse(
+                "done",
+                {
+                    "answer": stats.answer,
+                    "cached": False,
+                    "time_to_first_token": stats.time_to_first_token,
+                    "total_time": stats.total_time,
+                },
+            )
+        )
+        return response
+
+
+async def delete_session(request: web.Request) -> web.Response:
+    if not request.app[SESSIONS].delete(request.match_info["session_id"]):
+        raise web.HTTPNotFound()
+    return web.Response(status=204)
+
+
+async def metrics(request: web.Request) -> web.Response:
+    tracer = get_request_tracer()
+    if tracer is None or tracer.metrics is None:
+        raise web.HTTPNotFound(text="Tracing is disabled (TRACING=0)")
+    return web.Response(text=tracer.metrics.render(), content_type="text/plain")
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", "sessions": len(request.app[SESSIONS])})
+
+
+def create_app(db_path: str = DB_PATH) -> web.Application:
+    """
+    Build the aiohttp application with the retriever, chain and caches loaded.
+    """
+    retriever = load_faiss_vector_store(db_path)
+    # A first query embeds text and searches the index before any client is served
+    retriever.invoke("How can I cope with stress?")
+    app = web.Application()
+    app[CHAIN] = create_conversational_chain(retriever)
+    # Shares the query embedding model with the retriever
+    app[ANSWER_CACHE] = SemanticAnswerCache.from_env(
+        retriever.vectorstore.embeddings, index_version(db_path)
+    )
+    app[SESSIONS] = SessionStore.from_env(create_summary_chain(get_chat_model()))
+    app.add_routes(
+        [
+            web.post("/chat", chat),
+            web.delete("/sessions/{session_id}", delete_session),
+            web.get("/health", health),
+            web.get("/metrics", metrics),
+        ]
+    )
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db-path", default=DB_PATH)
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    web.run_app(create_app(args.db_path), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pytest
+
+from llm.answer_cache import answer_cache_policy
+
+QUESTIONS = [
+    "How can I sleep better at night?",
+    "What are the early signs of depression?",
+    "Can you explain that in more detail?",
+    "What about at work?",
+]
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_first_turn_answers_are_looked_up_and_stored(question):
+    assert answer_cache_policy(0, question) == (True, True)
+
+
+@pytest.mark.parametrize("history_turns", [1, 2, 10])
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_later_turn_answers_are_never_stored(history_turns, question):
+    _, may_store = answer_cache_policy(history_turns, question)
+    assert not may_store
+
+
+def test_self_contained_follow_up_may_still_be_served_from_cache():
+    may_look_up, may_store = answer_cache_policy(3, "How can I sleep better at night?")
+    assert may_look_up and not may_store
+
+
+def test_referring_follow_up_is_not_looked_up():
+    assert answer_cache_policy(3, "Can you explain that in more detail?") == (False, False)
@@ -0,0 +1,18 @@
+from app_utils.session_store import SessionStore
+
+
+def test_store_never_exceeds_max_sessions():
+    store = SessionStore(max_sessions=2)
+    for _ in range(3):
+        store.get()
+    assert len(store) == 2
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(max_sessions=2)
+    first = store.get().session_id
+    second = store.get().session_id
+    store.get(first)
+    store.get()
+    assert store.get(first).session_id == first
+    assert not store.delete(second)